@@ -0,0 +1,14 @@
+#%%
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from refinement import main
+
+#%%
+#Read JSON file, refine the grid in the given windows and draw the contour map (see refinement.py), e.g.
+#python refined-contour-map.py --window 100 120 90 110 4 --output refined.png
+#Each --window is: starting cell, ending cell on y axis, starting cell, ending cell on x axis, refining step
+extent = ['32.45585808775892', '32.50739565519518', '34.73041834971132', '34.76665194213551']
+if __name__ == "__main__":
+    main(['41de94ea9d135d78636a4bf0739551064dab697f.json', '--extent', *extent] + sys.argv[1:])
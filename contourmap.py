@@ -0,0 +1,236 @@
+"""Карты изолиний по сеткам напоров (feb10head.csv, JSON-массивы).
+
+Функции вызываются из кода без input(): одна загрузка matplotlib на любое
+число карт. Драйвер принимает параметры из командной строки или из JSON-файла
+конфигурации со списком карт.
+
+Пример:
+    python contourmap.py contour/feb10head.csv --extent 32.455 32.507 34.730 34.767 --levels 10 --output head.png
+    python contourmap.py --config maps.json
+    python contourmap.py --batch "heads/*.csv" --extent 32.455 32.507 34.730 34.767 --output maps --workers 8
+
+Файл конфигурации — объект карты или список объектов с ключами grid, extent,
+levels, output и необязательными title, cmap, colorbar_label, label_rotation,
+label_distance, invert_x, invert_y, dpi, vmin, vmax, percentiles, geotiff, compress.
+Ключ defaults (если файл — объект с ключом maps) задает общие значения для
+всех карт.
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+
+from headgrid import HeadGrid, color_limits, grid_axes
+
+
+def make_contour_map(data, extent, levels=10, cmap=None, title='', colorbar_label='', label_rotation=0,
+                     label_distance=0, invert_x=False, invert_y=False, output=None, dpi=300, vmin=None, vmax=None,
+                     percentiles=None, axes=None, triangulation=None):
+    """Строит карту изолиний с цветовой шкалой.
+
+    data — HeadGrid или массив с NaN в узлах без данных; такие узлы остаются
+    на карте пустыми, а значения за пределами шкалы закрашиваются крайними
+    цветами (extend_mode). levels — число уровней между vmin и vmax (по
+    умолчанию grid.color_limits(percentiles)) или явный массив уровней. Если задан
+    output, карта сохраняется (формат по расширению: jpg, png, svg) и фигура
+    закрывается; иначе фигура возвращается. axes = (x, y) задает координаты
+    столбцов и строк явно (например, неравномерные оси refinement.py), тогда
+    extent не используется. С triangulation (matplotlib.tri.Triangulation,
+    например адаптивной сетки refinement.py) data — значения в ее вершинах и
+    карта строится через tricontourf.
+    """
+    if triangulation is None:
+        grid = data if isinstance(data, HeadGrid) else HeadGrid(data, nodata=())
+        values = grid.values
+        x, y = axes if axes is not None else grid_axes(grid.shape, extent)
+    else:
+        values = np.asarray(data, dtype=np.float32)
+    if np.isscalar(levels):
+        a, b = color_limits(values, percentiles)
+        levels = np.linspace(a if vmin is None else vmin, b if vmax is None else vmax, int(levels))
+    extend = extend_mode(values, levels)
+
+    fig, ax = plt.subplots()
+    ax.set_xlabel('Latitude')
+    ax.set_ylabel('Longitude')
+    ax.set_title(title)
+    if triangulation is None:
+        contours = ax.contourf(x, y, values, corner_mask=False, levels=levels, cmap=cmap or None, extend=extend)
+    else:
+        contours = ax.tricontourf(triangulation, values, levels=levels, cmap=cmap or None, extend=extend)
+    if invert_x:
+        ax.invert_xaxis()
+    if invert_y:
+        ax.invert_yaxis()
+    clb = fig.colorbar(contours, ax=ax, ticks=levels)
+    clb.set_label(label=colorbar_label, rotation=label_rotation, labelpad=label_distance)
+
+    if output is None:
+        return fig
+    fig.savefig(output, dpi=dpi)
+    plt.close(fig)
+    return output
+
+
+def extend_mode(values, levels):
+    """Параметр extend для contourf: какие края шкалы обрезают данные.
+
+    Значения за пределами уровней (шкала по процентилям или узкие vmin/vmax)
+    закрашиваются крайними цветами, а не остаются пустыми, как узлы без данных.
+    """
+    below = np.nanmin(values) < levels[0]
+    above = np.nanmax(values) > levels[-1]
+    if below and above:
+        return 'both'
+    return 'min' if below else 'max' if above else 'neither'
+
+
+# Параметры карты, которые передаются в make_contour_map как есть
+MAP_OPTIONS = ('levels', 'cmap', 'title', 'colorbar_label', 'label_rotation', 'label_distance',
+               'invert_x', 'invert_y', 'dpi', 'vmin', 'vmax', 'percentiles')
+
+
+def render_map(spec, base_dir='.'):
+    """Рисует одну карту по описанию spec (словарь ключей конфигурации)."""
+    grid = HeadGrid.read(os.path.join(base_dir, spec['grid']))
+    extent = tuple(spec['extent'])
+    if spec.get('geotiff'):
+        from geotiff import export_geotiff  # GDAL нужен только для растров
+        export_geotiff(grid.values, extent, os.path.join(base_dir, spec['geotiff']),
+                       compress=spec.get('compress', 'DEFLATE'))
+    options = {key: spec[key] for key in MAP_OPTIONS if spec.get(key) is not None}
+    return make_contour_map(grid, extent, output=os.path.join(base_dir, spec['output']), **options)
+
+
+def shared_color_range(paths, percentiles=None):
+    """Общая шкала для набора сеток за один потоковый проход: в памяти одна сетка за раз.
+
+    С percentiles берутся крайние из процентилей отдельных сеток.
+    """
+    low, high = np.inf, -np.inf
+    for path in paths:
+        a, b = HeadGrid.read(path).color_limits(percentiles)
+        low, high = min(low, a), max(high, b)
+    return low, high
+
+
+def init_worker():
+    """Процессы пакетного режима рисуют без дисплея."""
+    matplotlib.use('Agg')
+
+
+def render_batch(pattern, output_dir, extent, workers=None, image_format='png', rasters=True, shared_scale=True,
+                 compress='DEFLATE', **options):
+    """Карты для всех сеток по шаблону glob в пуле процессов.
+
+    Для каждой сетки пишется изображение и (rasters) GeoTIFF со сжатием compress
+    с тем же именем в output_dir. При shared_scale шкала всех карт общая, ее
+    границы находятся заранее одним проходом по сеткам. Возвращает пути
+    изображений в порядке сеток.
+    """
+    paths = sorted(glob.glob(pattern))
+    if not paths:
+        raise ValueError(f"Нет сеток по шаблону {pattern}.")
+    os.makedirs(output_dir, exist_ok=True)
+    if shared_scale:
+        options['vmin'], options['vmax'] = shared_color_range(paths, options.get('percentiles'))
+
+    specs = []
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        spec = {**options, 'grid': path, 'extent': extent, 'output': os.path.join(output_dir, f'{name}.{image_format}')}
+        if rasters:
+            spec['geotiff'] = os.path.join(output_dir, f'{name}.tif')
+            spec['compress'] = compress
+        specs.append(spec)
+
+    workers = workers or os.cpu_count()
+    chunksize = max(1, len(specs) // (workers * 4))
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker) as executor:
+        return list(executor.map(render_map, specs, chunksize=chunksize))
+
+
+def stack_grids(paths, extent, file_path, compress='DEFLATE'):
+    """Складывает сетки в один многоканальный COG: канал на файл, метка канала — имя файла."""
+    from geotiff import export_geotiff_stack
+
+    labels = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    export_geotiff_stack((HeadGrid.read(path).values for path in paths), labels, extent, file_path, compress=compress)
+
+
+def read_config(file_path):
+    """Список описаний карт из JSON-конфигурации."""
+    with open(file_path) as f:
+        config = json.load(f)
+    if isinstance(config, list):
+        return config
+    if 'maps' in config:
+        return [{**config.get('defaults', {}), **spec} for spec in config['maps']]
+    return [config]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Карты изолиний по сеткам напоров.")
+    parser.add_argument('grid', nargs='?', help="Сетка: CSV без заголовка или JSON-массив")
+    parser.add_argument('--config', help="JSON-файл с описанием одной или нескольких карт")
+    parser.add_argument('--extent', type=float, nargs=4, metavar=('XMIN', 'XMAX', 'YMIN', 'YMAX'))
+    parser.add_argument('--levels', type=int, default=10, help="Число уровней шкалы")
+    parser.add_argument('--output', help="Файл карты (.png, .jpg, .svg)")
+    parser.add_argument('--dpi', type=int, default=300)
+    parser.add_argument('--title', default='')
+    parser.add_argument('--cmap', help="Цветовая схема matplotlib, например Greens")
+    parser.add_argument('--colorbar-label', default='')
+    parser.add_argument('--label-rotation', type=int, default=0)
+    parser.add_argument('--label-distance', type=int, default=0)
+    parser.add_argument('--percentiles', type=float, nargs=2, metavar=('LOW', 'HIGH'),
+                        help="Границы шкалы по процентилям вместо минимума и максимума")
+    parser.add_argument('--invert-x', action='store_true')
+    parser.add_argument('--invert-y', action='store_true')
+    parser.add_argument('--geotiff', help="Дополнительно сохранить сетку в GeoTIFF")
+    parser.add_argument('--compress', choices=('DEFLATE', 'LZW', 'NONE'), default='DEFLATE', help="Сжатие GeoTIFF")
+    parser.add_argument('--batch', metavar='PATTERN', help="Шаблон glob сеток; --output тогда каталог карт")
+    parser.add_argument('--workers', type=int, help="Число процессов пакетного режима")
+    parser.add_argument('--format', default='png', help="Формат карт пакетного режима (png, jpg, svg)")
+    parser.add_argument('--no-rasters', action='store_true', help="Не писать GeoTIFF в пакетном режиме")
+    parser.add_argument('--stack', help="Пакетный режим: дополнительно сложить все сетки в один многоканальный GeoTIFF")
+    parser.add_argument('--separate-scales', action='store_true', help="Своя шкала у каждой карты пакета")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.batch:
+        if not (args.extent and args.output):
+            raise SystemExit("Нужны --extent и --output для пакетного режима.")
+        options = {key: getattr(args, key) for key in MAP_OPTIONS if getattr(args, key, None) is not None}
+        paths = render_batch(args.batch, args.output, tuple(args.extent), args.workers, args.format,
+                             rasters=not args.no_rasters, shared_scale=not args.separate_scales,
+                             compress=args.compress, **options)
+        print(f"Сохранено карт: {len(paths)} в {args.output}")
+        if args.stack:
+            stack_grids(sorted(glob.glob(args.batch)), tuple(args.extent), args.stack, args.compress)
+            print(f"Сохранен стек сеток: {args.stack}")
+        return
+
+    if args.config:
+        specs = read_config(args.config)
+        base_dir = os.path.dirname(os.path.abspath(args.config))
+    else:
+        if not (args.grid and args.extent and args.output):
+            raise SystemExit("Нужны сетка, --extent и --output (или --config).")
+        specs = [vars(args)]
+        base_dir = '.'
+
+    for spec in specs:
+        print(f"Сохранена карта: {render_map(spec, base_dir)}")
+
+
+if __name__ == "__main__":
+    main()
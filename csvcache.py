@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+META_FILE = 'meta.json'
+
+
+def cache_dir(file_path, kind='frame'):
+    """Каталог кэша рядом с исходным файлом: data.csv -> data.csv.frame.cache"""
+    return f'{file_path}.{kind}.cache'
+
+
+def file_digest(file_path, block_size=1 << 20):
+    """SHA-1 содержимого файла, читается блоками."""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_info(file_path):
+    stat = os.stat(file_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def read_meta(directory):
+    with open(os.path.join(directory, META_FILE)) as f:
+        return json.load(f)
+
+
+def write_meta(directory, meta):
+    with open(os.path.join(directory, META_FILE), 'w') as f:
+        json.dump(meta, f)
+
+
+def is_fresh(directory, file_path, **expected):
+    """Проверяет, что кэш соответствует исходному файлу.
+
+    Размер и время изменения сверяются сразу; если время другое (копирование,
+    checkout), сверяется хеш содержимого. Дополнительные поля expected должны
+    совпасть с записанными в meta.json (например, параметры чтения).
+    """
+    try:
+        meta = read_meta(directory)
+    except (OSError, ValueError):
+        return False
+
+    info = source_info(file_path)
+    if meta.get('size') != info['size'] or any(meta.get(key) != value for key, value in expected.items()):
+        return False
+    if meta.get('mtime_ns') == info['mtime_ns']:
+        return True
+
+    if meta.get('sha1') != file_digest(file_path):
+        return False
+    meta['mtime_ns'] = info['mtime_ns']
+    try:
+        write_meta(directory, meta)
+    except OSError:
+        pass
+    return True
+
+
+def start_bundle(directory):
+    """Готовит каталог кэша к записи.
+
+    meta.json удаляется в начале и пишется последним (finish_bundle), поэтому
+    прерванная запись не будет принята за свежий кэш.
+    """
+    os.makedirs(directory, exist_ok=True)
+    meta_path = os.path.join(directory, META_FILE)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+
+def open_bundle_array(directory, name, dtype, shape):
+    """Создает массив кэша .npy на диске для заполнения по частям."""
+    return np.lib.format.open_memmap(os.path.join(directory, f'{name}.npy'), mode='w+', dtype=dtype, shape=shape)
+
+
+def finish_bundle(directory, file_path, digest=None, **extra):
+    """Записывает meta.json; после этого кэш считается готовым."""
+    digest = digest if digest is not None else file_digest(file_path)
+    write_meta(directory, {**source_info(file_path), 'sha1': digest, **extra})
+
+
+def write_bundle(directory, file_path, arrays, **extra):
+    """Пишет массивы в .npy и затем meta.json."""
+    start_bundle(directory)
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f'{name}.npy'), array)
+    finish_bundle(directory, file_path, **extra)
+
+
+def replace_bundle(source, directory):
+    """Ставит собранный каталог source на место кэша directory.
+
+    Прежний кэш сначала отодвигается и удаляется после замены: файлы, которые
+    еще открыты через memory-map, остаются доступны до закрытия.
+    """
+    old = None
+    if os.path.exists(directory):
+        old = tempfile.mkdtemp(prefix=f'{os.path.basename(directory)}.', suffix='.old',
+                               dir=os.path.dirname(os.path.abspath(directory)))
+        os.rmdir(old)
+        os.replace(directory, old)
+    try:
+        os.replace(source, directory)
+    except OSError:
+        if old is not None:
+            os.replace(old, directory)
+        raise
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def read_bundle(directory, names):
+    """Открывает массивы кэша через memory-map, без чтения в память."""
+    return {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r') for name in names}
+
+
+def read_csv_cached(file_path, **read_csv_kwargs):
+    """pd.read_csv с колоночным кэшем .npy рядом с файлом.
+
+    Первый вызов разбирает текст и сохраняет каждую колонку отдельным .npy;
+    следующие открывают колонки через memory-map и не разбирают CSV.
+    Текстовые колонки с пропусками не кэшируются — такой файл просто читается заново.
+    """
+    directory = cache_dir(file_path)
+    options = json.dumps(read_csv_kwargs, sort_keys=True, default=str)
+    if is_fresh(directory, file_path, read_csv=options):
+        meta = read_meta(directory)
+        arrays = read_bundle(directory, [f'column{i}' for i in range(len(meta['columns']))])
+        return pd.DataFrame({column: arrays[f'column{i}'] for i, column in enumerate(meta['columns'])}, copy=False)
+
+    data = pd.read_csv(file_path, **read_csv_kwargs)
+    arrays = {}
+    for i, column in enumerate(data.columns):
+        values = data[column].to_numpy()
+        if values.dtype == object:
+            if data[column].isna().any():
+                return data
+            values = values.astype(str)
+        arrays[f'column{i}'] = values
+
+    try:
+        write_bundle(directory, file_path, arrays, read_csv=options, columns=data.columns.tolist())
+    except OSError:
+        pass  # Кэш необязателен: каталог может быть только для чтения
+    return data
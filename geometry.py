@@ -0,0 +1,226 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+import pyvista as pv
+from matplotlib import colormaps
+
+from gridding import Gridder
+from refinement import bilinear
+
+
+def layer_mesh(layers, plane_resolution=30, bounds=(-30, 30, -30, 30), seed=0, cache_dir=None):
+    """Объединяет все почвенные слои (объем и текстурированную кровлю) в один меш.
+
+    Цвет и прозрачность хранятся по ячейкам в массиве 'rgba', поэтому вся
+    геология рисуется одним актером. Рельеф кровли детерминирован seed, а готовый
+    меш кэшируется, так что повторная сцена с теми же параметрами не пересчитывается.
+    Возвращает меш и словарь глубин кровли слоев.
+    """
+    frozen = tuple(tuple(sorted(layer.items())) for layer in layers)
+    return _cached_layer_mesh(frozen, plane_resolution, tuple(bounds), seed, cache_dir)
+
+
+@lru_cache(maxsize=8)
+def _cached_layer_mesh(frozen_layers, plane_resolution, bounds, seed, cache_dir):
+    parts = []
+    tops = {}
+    current_depth = 0
+    xmin, xmax, ymin, ymax = bounds
+    center = ((xmin + xmax) / 2, (ymin + ymax) / 2)
+
+    for index, layer in enumerate(map(dict, frozen_layers)):
+        # Текстурированная кровля слоя с вариацией высоты
+        top_surface = pv.Plane(center=(*center, current_depth), i_size=xmax - xmin, j_size=ymax - ymin,
+                               i_resolution=plane_resolution, j_resolution=plane_resolution)
+        top_surface.points[:, 2] += surface_variation(seed, plane_resolution, index, cache_dir)
+
+        bottom_z = current_depth - layer['height']
+        cube = pv.Box(bounds=(xmin, xmax, ymin, ymax, bottom_z, current_depth))
+
+        cube.cell_data['rgba'] = _cell_colors(cube, layer['color'], layer['opacity'])
+        top_surface.cell_data['rgba'] = _cell_colors(top_surface, layer['color'], min(layer['opacity'] + 0.1, 1))
+        parts += [cube, top_surface]
+
+        tops[layer['name']] = current_depth
+        current_depth = bottom_z
+
+    return pv.merge(parts, merge_points=False), tops
+
+
+# Разрешение, на котором генерируется рельеф кровли; остальные разрешения — его выборки
+TERRAIN_RESOLUTION = 30
+
+
+@lru_cache(maxsize=64)
+def surface_variation(seed, resolution, layer_index, cache_dir=None):
+    """Вариация высоты узлов кровли слоя, одинаковая для одного seed и разрешения.
+
+    Рельеф генерируется один раз на сетке TERRAIN_RESOLUTION, а другие
+    разрешения получают его билинейную выборку в своих узлах: уровни
+    детализации — огрубления одной поверхности, и переключение между ними не
+    меняет рельеф. Результат хранится в памяти (LRU) и, если задан cache_dir,
+    в файле .npy, чтобы не генерировать его заново в следующих запусках.
+    """
+    file_path = None
+    if cache_dir is not None:
+        file_path = os.path.join(cache_dir, f'surface_{seed}_{resolution}_{layer_index}.npy')
+        if os.path.exists(file_path):
+            variation = np.load(file_path)
+            variation.flags.writeable = False
+            return variation
+
+    if resolution == TERRAIN_RESOLUTION:
+        rng = np.random.default_rng((seed, layer_index))
+        variation = rng.uniform(-0.5, 0.5, (resolution + 1) ** 2).astype(np.float32)
+    else:
+        # Узлы плоскости идут строками по Y, внутри строки по X
+        terrain = surface_variation(seed, TERRAIN_RESOLUTION, layer_index, cache_dir)
+        nodes = np.linspace(0, TERRAIN_RESOLUTION, resolution + 1)
+        variation = bilinear(terrain.reshape(TERRAIN_RESOLUTION + 1, -1), nodes[:, None], nodes[None, :]).ravel()
+
+    if file_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(file_path, variation)
+
+    # Массив общий для всех вызовов, поэтому защищен от записи
+    variation.flags.writeable = False
+    return variation
+
+
+def _cell_colors(mesh, color, opacity):
+    """Массив RGBA одного цвета на все ячейки меша."""
+    return np.tile(np.array(pv.Color(color, opacity=opacity).int_rgba, dtype=np.uint8), (mesh.n_cells, 1))
+
+
+def well_colors(n_wells, palette, cmap='turbo'):
+    """Цвета скважин (n_wells x 3, uint8).
+
+    Небольшие поля раскрашиваются именованной палитрой, большие — равномерной
+    выборкой из непрерывной карты цветов, без цикла по скважинам.
+    """
+    if n_wells <= len(palette):
+        return np.array([pv.Color(color).int_rgb for color in palette[:n_wells]], dtype=np.uint8)
+    return (colormaps[cmap](np.linspace(0, 1, n_wells))[:, :3] * 255).astype(np.uint8)
+
+
+class WellGlyphs:
+    """Все скважины одним мешем: шаблонный цилиндр, размноженный по координатам скважин.
+
+    Высоты цилиндров и скаляры меняются на месте одной операцией NumPy,
+    поэтому число актеров не зависит от количества скважин.
+    """
+
+    def __init__(self, x, y, radius=0.5, resolution=16):
+        template = pv.Cylinder(center=(0, 0, 0.5), direction=(0, 0, 1), radius=radius, height=1,
+                               resolution=resolution).triangulate()
+        self.n_wells = len(x)
+        self.n_template = template.n_points
+        self.cells_per_well = template.n_cells
+
+        # Нормированная высота вершин шаблона: 0 у дна, 1 у верхнего торца
+        self.template_z = template.points[:, 2].astype(np.float32)
+
+        points = np.empty((self.n_wells, self.n_template, 3), dtype=np.float32)
+        points[..., 0] = np.asarray(x, dtype=np.float32)[:, None] + template.points[:, 0]
+        points[..., 1] = np.asarray(y, dtype=np.float32)[:, None] + template.points[:, 1]
+        points[..., 2] = self.template_z
+
+        faces = template.faces.reshape(-1, 4)
+        all_faces = np.tile(faces, (self.n_wells, 1, 1))
+        all_faces[..., 1:] += (np.arange(self.n_wells) * self.n_template)[:, None, None]
+
+        self.mesh = pv.PolyData(points.reshape(-1, 3), all_faces.ravel())
+
+    def set_heights(self, bottom, top):
+        """Растягивает цилиндры между bottom и top (числа или массивы по скважинам)."""
+        bottom = np.broadcast_to(np.asarray(bottom, dtype=np.float32), (self.n_wells,))
+        top = np.broadcast_to(np.asarray(top, dtype=np.float32), (self.n_wells,))
+        z = self.mesh.points.reshape(self.n_wells, self.n_template, 3)
+        z[..., 2] = bottom[:, None] + self.template_z * (top - bottom)[:, None]
+        self.mesh.GetPoints().Modified()
+
+    def set_scalars(self, name, values):
+        """Записывает значение каждой скважины во все ее вершины, на месте."""
+        if name not in self.mesh.point_data:
+            self.mesh.point_data[name] = np.zeros(self.mesh.n_points, dtype=np.float32)
+        array = self.mesh.point_data[name]
+        array.reshape(self.n_wells, self.n_template)[:] = np.asarray(values, dtype=np.float32)[:, None]
+        self.mesh.GetPointData().GetArray(name).Modified()
+
+    def set_cell_colors(self, colors):
+        """Задает цвет RGB каждой скважины (массив n_wells x 3, uint8)."""
+        self.mesh.cell_data['rgb'] = np.repeat(np.asarray(colors, dtype=np.uint8), self.cells_per_well, axis=0)
+
+    def translate(self, dx, dy):
+        """Сдвигает все скважины на (dx, dy) на месте; высоты и скаляры сохраняются."""
+        points = self.mesh.points
+        points[:, 0] += np.float32(dx)
+        points[:, 1] += np.float32(dy)
+        self.mesh.GetPoints().Modified()
+
+
+class LevelOfDetail:
+    """Выбор уровня детализации по расстоянию камеры и бюджету времени кадра.
+
+    Уровни нумеруются от грубого (0) к подробному. Расстояние камеры,
+    отнесенное к размеру сцены, задает желаемый уровень; если кадр рисуется
+    дольше бюджета, верхняя граница уровня понижается, а при большом запасе
+    времени снова повышается.
+
+    Камера после reset_camera стоит на расстоянии около 1.93 размера сцены
+    (угол обзора 30°), поэтому первый порог выше: вся сцена видна с полной
+    детализацией, огрубление начинается при заметном отдалении.
+    """
+
+    def __init__(self, n_levels, frame_budget=1 / 30, thresholds=(2.5, 5.0)):
+        self.n_levels = n_levels
+        self.frame_budget = frame_budget
+        self.thresholds = np.asarray(thresholds)
+        self.max_level = n_levels - 1
+
+    def select(self, distance, scene_size, frame_time):
+        """Возвращает уровень для текущей камеры и времени последнего кадра."""
+        if frame_time > self.frame_budget and self.max_level > 0:
+            self.max_level -= 1
+        elif frame_time < self.frame_budget / 3 and self.max_level < self.n_levels - 1:
+            self.max_level += 1
+
+        # Чем дальше камера относительно размера сцены, тем грубее уровень
+        wanted = self.n_levels - 1 - int(np.searchsorted(self.thresholds, distance / scene_size))
+        return int(np.clip(wanted, 0, self.max_level))
+
+
+class PiezometricSurface:
+    """Пьезометрическая поверхность по полю скважин.
+
+    Регулярная сетка над полем; высота и скаляры узлов — уровень воды,
+    интерполированный по скважинам (gridding.Gridder, по умолчанию IDW по
+    ближайшим скважинам). Веса считаются один раз, а каждый кадр — одно
+    умножение разреженной матрицы и перезапись координат и скаляров на месте.
+    """
+
+    def __init__(self, wells, bounds, resolution=50, neighbours=8, power=2, method='idw'):
+        xmin, xmax, ymin, ymax = bounds
+        self.mesh = pv.Plane(center=((xmin + xmax) / 2, (ymin + ymax) / 2, 0), i_size=xmax - xmin,
+                             j_size=ymax - ymin, i_resolution=resolution, j_resolution=resolution)
+
+        self.method = method
+        self.options = {'neighbours': neighbours, 'power': power} if method == 'idw' else {}
+        self.move_wells(wells.xy)
+        self.mesh.point_data['Уровень воды'] = np.zeros(self.mesh.n_points, dtype=np.float32)
+
+    def move_wells(self, xy):
+        """Пересчитывает веса для новых координат скважин; узлы поверхности остаются на месте."""
+        self.gridder = Gridder(xy, self.mesh.points[:, :2], self.method, **self.options)
+
+    def update(self, levels):
+        """Пересчитывает поверхность для уровней скважин; скважины без данных (NaN) пропускаются."""
+        heads = self.gridder.grid(levels)
+
+        # Узлы без единой соседней скважины с данными получают средний уровень кадра
+        heads = np.where(np.isnan(heads), np.nanmean(levels) if not np.all(np.isnan(levels)) else 0.0, heads)
+        self.mesh.points[:, 2] = heads
+        self.mesh.point_data['Уровень воды'][:] = heads
+        self.mesh.GetPoints().Modified()
+        self.mesh.GetPointData().GetArray('Уровень воды').Modified()
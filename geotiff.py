@@ -0,0 +1,245 @@
+"""Запись сеток напоров в GeoTIFF (GDAL).
+
+Геопривязка считается прямо из охвата сетки. Массив пишется полосами по
+высоте блока, поэтому большие сетки (в том числе открытые через memory-map)
+экспортируются с ограниченным расходом памяти. По умолчанию файл тайловый,
+сжат DEFLATE и, если сетка больше одного блока, содержит обзоры (пирамиды) —
+такие файлы быстро открываются в ГИС.
+
+Сетки напоров ориентированы как headgrid.grid_axes (строка 0 — ymin,
+столбец 0 — xmax), а GeoTIFF хранится обычным образом, северный край
+сверху; при записи и чтении сетка поворачивается на 180°.
+
+Временной ряд сеток пишется в один многоканальный файл (GeoTiffStack): канал
+на период с меткой в описании, так что один период или историю одного узла
+можно прочитать, не открывая сотни файлов.
+"""
+import itertools
+
+import numpy as np
+from osgeo import gdal, osr
+
+COMPRESSIONS = ('DEFLATE', 'LZW', 'NONE')
+
+
+def geotransform(extent, shape):
+    """Геопривязка GDAL для охвата (xmin, xmax, ymin, ymax) и сетки shape = (rows, cols).
+
+    (левый верхний x, размер пикселя по x, поворот, левый верхний y, поворот, размер пикселя по y)
+    """
+    xmin, xmax, ymin, ymax = extent
+    nrows, ncols = shape
+    return (xmin, (xmax - xmin) / float(ncols), 0, ymax, 0, -(ymax - ymin) / float(nrows))
+
+
+def creation_options(compress='DEFLATE', tiled=True, block_size=256, interleave=None):
+    """Параметры создания GTiff: тайлы, сжатие с предиктором для float, BigTIFF при необходимости.
+
+    interleave ('BAND' или 'PIXEL') задает порядок каналов в многоканальном файле;
+    по умолчанию GDAL пишет их попиксельно.
+    """
+    if compress not in COMPRESSIONS:
+        raise ValueError(f"Неизвестное сжатие: {compress}.")
+    options = ['BIGTIFF=IF_SAFER', f'COMPRESS={compress}']
+    if compress != 'NONE':
+        options.append('PREDICTOR=3')  # Предиктор для чисел с плавающей точкой
+    if tiled:
+        options += ['TILED=YES', f'BLOCKXSIZE={block_size}', f'BLOCKYSIZE={block_size}']
+    if interleave is not None:
+        options.append(f'INTERLEAVE={interleave}')
+    return options
+
+
+def overview_factors(shape, block_size=256):
+    """Уровни обзоров 2, 4, 8, ... пока уменьшенная сетка не меньше одного блока."""
+    factors = []
+    factor = 2
+    while max(shape) / factor >= block_size:
+        factors.append(factor)
+        factor *= 2
+    return factors
+
+
+def create_geotiff(file_path, shape, extent, bands=1, epsg=4326, nodata=np.nan, compress='DEFLATE', tiled=True,
+                   block_size=256, interleave=None):
+    """Создает пустой GeoTIFF float32 с геопривязкой и nodata во всех каналах."""
+    nrows, ncols = shape
+    output_raster = gdal.GetDriverByName('GTiff').Create(file_path, ncols, nrows, bands, gdal.GDT_Float32,
+                                                         creation_options(compress, tiled, block_size, interleave))
+    if output_raster is None:
+        raise OSError(f"Не удалось создать GeoTIFF {file_path}: {gdal.GetLastErrorMsg()}")
+    output_raster.SetGeoTransform(geotransform(extent, shape))
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(epsg)
+    output_raster.SetProjection(srs.ExportToWkt())
+    for index in range(1, bands + 1):
+        output_raster.GetRasterBand(index).SetNoDataValue(nodata)
+    return output_raster
+
+
+def write_band(band, data, block_size=256):
+    """Пишет сетку в канал полосами по block_size строк; в памяти одна полоса float32.
+
+    Строки растра идут с севера, поэтому полоса берется с конца сетки и поворачивается.
+    """
+    nrows = np.shape(data)[0]
+    for row in range(0, nrows, block_size):
+        stop = min(row + block_size, nrows)
+        band.WriteArray(np.asarray(data[nrows - stop:nrows - row][::-1, ::-1], dtype=np.float32), 0, row)
+
+
+def build_overviews(output_raster, factors, compress='DEFLATE', resampling='AVERAGE'):
+    """Встроенные обзоры с тем же сжатием; узлы nodata при усреднении пропускаются."""
+    if factors:
+        output_raster.BuildOverviews(resampling, list(factors), options=[f'COMPRESS_OVERVIEW={compress}'])
+
+
+def export_geotiff(data, extent, file_path, epsg=4326, nodata=np.nan, compress='DEFLATE', tiled=True,
+                   block_size=256, overviews=True):
+    """Сохраняет сетку в GeoTIFF float32; по умолчанию в WGS84, узлы без данных — NaN.
+
+    overviews: True — уровни по размеру сетки (overview_factors), False —
+    без обзоров, или явный список уровней.
+    """
+    shape = np.shape(data)
+    output_raster = create_geotiff(file_path, shape, extent, 1, epsg, nodata, compress, tiled, block_size)
+    write_band(output_raster.GetRasterBand(1), data, block_size)
+    if overviews is True:
+        overviews = overview_factors(shape, block_size)
+    build_overviews(output_raster, overviews or [], compress)
+    output_raster.FlushCache()
+
+
+class GeoTiffStack:
+    """Многоканальный GeoTIFF временного ряда: один канал на период, добавляются по одному.
+
+    Каналы пишутся во временный тайловый GTiff рядом с file_path, в памяти
+    одна полоса сетки. close() переписывает его драйвером COG (Cloud Optimized
+    GeoTIFF: тайлы, сжатие, обзоры, заголовок в начале файла) либо, при
+    cog=False, просто переименовывает. У каждого канала описание — метка
+    периода, в метаданных — номер периода и переданные поля.
+
+    Каналы хранятся раздельно (INTERLEAVE=BAND): запись периода и чтение одного
+    периода (read_period) касаются только его блоков. Драйвер COG умеет так
+    начиная с GDAL 3.11; в более старых версиях COG получается попиксельным —
+    чтение периода распаковывает блоки всех каналов, зато история одного узла
+    (pixel_history) читается из одного блока.
+    """
+
+    def __init__(self, file_path, shape, extent, n_periods, epsg=4326, nodata=np.nan, compress='DEFLATE',
+                 block_size=256, cog=True):
+        self.file_path = file_path
+        self.compress = compress
+        self.block_size = block_size
+        self.cog = cog
+        self.shape = tuple(shape)
+        self.n_periods = n_periods
+        self.count = 0
+        self.temp_path = f'{file_path}.part.tif' if cog else file_path
+        self.dataset = create_geotiff(self.temp_path, self.shape, extent, n_periods, epsg, nodata,
+                                      'NONE' if cog else compress, True, block_size, 'BAND')
+
+    def append(self, data, label, **metadata):
+        """Записывает сетку следующего периода в очередной канал."""
+        if self.count == self.n_periods:
+            raise ValueError(f"В стеке уже {self.n_periods} каналов.")
+        if np.shape(data) != self.shape:
+            raise ValueError(f"Размер сетки {np.shape(data)} не совпадает с размером стека {self.shape}.")
+        self.count += 1
+        band = self.dataset.GetRasterBand(self.count)
+        band.SetDescription(str(label))
+        band.SetMetadata({'PERIOD': str(self.count - 1), 'LABEL': str(label),
+                          **{key.upper(): str(value) for key, value in metadata.items()}})
+        write_band(band, data, self.block_size)
+
+    def close(self):
+        """Завершает файл; для COG строит обзоры и удаляет временный файл."""
+        if self.count != self.n_periods:
+            raise ValueError(f"Записано каналов: {self.count} из {self.n_periods}.")
+        self.dataset.SetMetadata({'PERIODS': str(self.n_periods)})
+        if not self.cog:
+            build_overviews(self.dataset, overview_factors(self.shape, self.block_size), self.compress)
+            self.dataset.FlushCache()
+            self.dataset = None
+            return
+
+        self.dataset.FlushCache()
+        options = ['BIGTIFF=IF_SAFER', f'COMPRESS={self.compress}', f'BLOCKSIZE={self.block_size}',
+                   'OVERVIEWS=AUTO', 'RESAMPLING=AVERAGE']
+        if self.compress != 'NONE':
+            options.append('PREDICTOR=YES')
+        if int(gdal.VersionInfo()) >= 3110000:
+            options.append('INTERLEAVE=BAND')
+        output_raster = gdal.GetDriverByName('COG').CreateCopy(self.file_path, self.dataset, options=options)
+        if output_raster is None:
+            raise OSError(f"Не удалось записать COG {self.file_path}: {gdal.GetLastErrorMsg()}")
+        output_raster = None  # Файл дописывается при закрытии набора данных
+        self.dataset = None
+        gdal.GetDriverByName('GTiff').Delete(self.temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.dataset = None
+            gdal.GetDriverByName('GTiff').Delete(self.temp_path)
+
+
+def export_geotiff_stack(grids, labels, extent, file_path, **options):
+    """Записывает сетки периодов (итерируемые по одной) в один многоканальный GeoTIFF.
+
+    labels задает число каналов и их метки (Timestamp, номер периода, имя файла).
+    """
+    labels = list(labels)
+    grids = iter(grids)
+    first = next(grids, None)
+    if first is None:
+        raise ValueError("Нет сеток для записи.")
+    with GeoTiffStack(file_path, np.shape(first), extent, len(labels), **options) as stack:
+        for grid, label in zip(itertools.chain([first], grids), labels):
+            stack.append(grid, label)
+
+
+def open_raster(file_path):
+    """Открывает растр на чтение.
+
+    Без gdal.UseExceptions() GDAL сообщает об ошибках не исключением, а
+    возвращаемым None, поэтому результат проверяется явно.
+    """
+    dataset = gdal.Open(file_path)
+    if dataset is None:
+        raise OSError(f"Не удалось открыть растр {file_path}: {gdal.GetLastErrorMsg()}")
+    return dataset
+
+
+def raster_band(dataset, index):
+    """Канал index (с единицы) открытого растра."""
+    band = dataset.GetRasterBand(index) if 1 <= index <= dataset.RasterCount else None
+    if band is None:
+        raise IndexError(f"В растре {dataset.RasterCount} каналов, канала {index} нет.")
+    return band
+
+
+def read_array(source, *window):
+    """ReadAsArray канала или набора данных (window = xoff, yoff, xsize, ysize) с проверкой ошибки чтения."""
+    values = source.ReadAsArray(*window)
+    if values is None:
+        raise OSError(f"Не удалось прочитать растр: {gdal.GetLastErrorMsg()}")
+    return values
+
+
+def read_period(file_path, period):
+    """Сетка одного периода (канал period, с нуля) без чтения остальных каналов."""
+    dataset = open_raster(file_path)
+    return read_array(raster_band(dataset, period + 1))[::-1, ::-1]
+
+
+def pixel_history(file_path, row, col):
+    """Значения узла (row, col) сетки во всех периодах и метки периодов."""
+    dataset = open_raster(file_path)
+    values = read_array(dataset, dataset.RasterXSize - 1 - col, dataset.RasterYSize - 1 - row, 1, 1).reshape(-1)
+    labels = [dataset.GetRasterBand(i).GetDescription() for i in range(1, dataset.RasterCount + 1)]
+    return values, labels
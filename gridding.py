@@ -0,0 +1,196 @@
+"""Интерполяция уровней скважин на регулярную сетку напоров.
+
+Веса, переводящие значения скважин в узлы сетки, зависят только от положения
+скважин, поэтому считаются один раз (IDW по соседям из KD-дерева или
+барицентрические веса триангуляции Делоне) и хранятся разреженной матрицей.
+Кадр считается одним умножением матрицы; весь ряд — одним умножением на
+массив (n_wells, n_timestamps).
+
+Сетки в формате feb10head.csv и в ориентации headgrid.grid_axes: x убывает
+по столбцам (столбец 0 — xmax), y растет по строкам (строка 0 — ymin); узлы
+без данных — NaN (в CSV пишутся как 9999).
+
+Пример:
+    python gridding.py multipledata.csv --wells wells.csv --shape 50 50 --method linear --output heads
+"""
+import argparse
+import os
+
+import numpy as np
+from scipy.interpolate import CloughTocher2DInterpolator
+from scipy.sparse import csr_matrix, diags
+from scipy.spatial import Delaunay, cKDTree
+
+from headgrid import NODATA, grid_axes
+
+METHODS = ('idw', 'linear', 'cubic')
+
+
+def grid_points(extent, shape):
+    """Координаты узлов (n_nodes x 2) сетки shape = (rows, cols) на охвате extent = (xmin, xmax, ymin, ymax).
+
+    Оси берутся из grid_axes, поэтому сетки читаются картами изолиний без переворота.
+    """
+    X, Y = np.meshgrid(*grid_axes(shape, extent))
+    return np.column_stack([X.ravel(), Y.ravel()])
+
+
+class Gridder:
+    """Интерполяция со скважин в фиксированные узлы с заранее посчитанными весами.
+
+    Методы: 'idw' (обратные расстояния до ближайших скважин), 'linear'
+    (барицентрические веса треугольников Делоне) и 'cubic' (Клафа–Тохера на той
+    же триангуляции). idw и linear — разреженные линейные операторы; cubic
+    переиспользует триангуляцию и считает все переданные кадры одним вызовом.
+    Для linear и cubic узлы вне выпуклой оболочки скважин — NaN.
+    """
+
+    def __init__(self, xy, points, method='idw', neighbours=8, power=2):
+        if method not in METHODS:
+            raise ValueError(f"Неизвестный метод интерполяции: {method}.")
+        self.xy = np.asarray(xy, dtype=np.float64)
+        self.points = np.asarray(points, dtype=np.float64)
+        self.method = method
+
+        if method == 'idw':
+            self.weights = self._idw_weights(neighbours, power)
+        else:
+            self.triangulation = Delaunay(self.xy)
+            if method == 'linear':
+                self.weights = self._barycentric_weights()
+
+        if method != 'cubic':
+            # Нормированная копия: без пропусков кадр считается одним умножением
+            totals = np.asarray(self.weights.sum(axis=1)).ravel()
+            self.outside = totals == 0
+            self.normalized = diags(1.0 / np.where(self.outside, 1.0, totals)) @ self.weights
+
+    def _idw_weights(self, neighbours, power):
+        k = min(neighbours, len(self.xy))
+        distances, indices = cKDTree(self.xy).query(self.points, k=k)
+        distances = distances.reshape(len(self.points), k)
+        indices = indices.reshape(len(self.points), k)
+
+        # Узел, совпадающий со скважиной, берет ее значение целиком
+        with np.errstate(divide='ignore'):
+            weights = 1.0 / distances ** power
+        exact = distances == 0
+        on_well = exact.any(axis=1)
+        weights[on_well] = exact[on_well]
+
+        rows = np.repeat(np.arange(len(self.points)), k)
+        return csr_matrix((weights.ravel(), (rows, indices.ravel())), shape=(len(self.points), len(self.xy)))
+
+    def _barycentric_weights(self):
+        simplex = self.triangulation.find_simplex(self.points)
+        inside = simplex >= 0
+        transform = self.triangulation.transform[simplex[inside]]
+        partial = np.einsum('nij,nj->ni', transform[:, :2], self.points[inside] - transform[:, 2])
+        barycentric = np.column_stack([partial, 1 - partial.sum(axis=1)])
+
+        rows = np.repeat(np.flatnonzero(inside), 3)
+        columns = self.triangulation.simplices[simplex[inside]].ravel()
+        return csr_matrix((barycentric.ravel(), (rows, columns)), shape=(len(self.points), len(self.xy)))
+
+    def grid(self, values):
+        """Значения скважин (n_wells,) или (n_wells, n_frames) в узлах сетки.
+
+        Скважины без данных (NaN) пропускаются, веса остальных перенормируются.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        missing = np.isnan(values)
+
+        if self.method == 'cubic':
+            return self._grid_cubic(values, missing)
+        if not missing.any():
+            heads = self.normalized @ values
+            heads[self.outside] = np.nan
+            return heads
+
+        present = (~missing).astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (self.weights @ np.where(missing, 0.0, values)) / (self.weights @ present)
+
+    def _grid_cubic(self, values, missing):
+        if not missing.any():
+            return CloughTocher2DInterpolator(self.triangulation, values)(self.points)
+
+        # Кадрам с пропусками нужна своя триангуляция по скважинам с данными
+        frames = values.reshape(len(self.xy), -1)
+        gaps = missing.reshape(len(self.xy), -1)
+        result = np.empty((len(self.points), frames.shape[1]))
+        for j in range(frames.shape[1]):
+            valid = ~gaps[:, j]
+            if valid.sum() < 3:
+                result[:, j] = np.nan
+            else:
+                result[:, j] = CloughTocher2DInterpolator(self.xy[valid], frames[valid, j])(self.points)
+        return result.reshape((len(self.points),) + values.shape[1:])
+
+
+def grid_wells(xy, values, extent, shape, method='idw', **options):
+    """Сетка одного кадра: массив float32 (rows, cols), узлы без данных — NaN."""
+    gridder = Gridder(xy, grid_points(extent, shape), method, **options)
+    return gridder.grid(values).reshape(shape).astype(np.float32)
+
+
+def save_grid_csv(file_path, grid, nodata=NODATA, decimals=2):
+    """Пишет сетку в формате feb10head.csv: без заголовка, NaN заменяется на nodata."""
+    np.savetxt(file_path, np.where(np.isnan(grid), nodata, grid), delimiter=',', fmt=f'%.{decimals}f')
+
+
+def iter_grids(gridder, store, shape, batch=256):
+    """Сетки всех Timestamp индекса по порядку: (Timestamp, сетка rows x cols); batch кадров на умножение."""
+    depths = store.depths
+    for start in range(0, len(store), batch):
+        frames = gridder.grid(np.asarray(depths[:, start:start + batch]))
+        for j, timestamp in enumerate(store.timestamps[start:start + batch]):
+            yield timestamp, frames[:, j].reshape(shape).astype(np.float32)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Сетки напоров по уровням скважин, по одному CSV на Timestamp.")
+    parser.add_argument('csv', help="CSV с колонками Timestamp, Well1..WellN, Xpos, Ypos")
+    parser.add_argument('--wells', required=True, help="CSV с координатами скважин (Well, X, Y, Collar)")
+    parser.add_argument('--shape', type=int, nargs=2, default=(50, 50), metavar=('ROWS', 'COLS'))
+    parser.add_argument('--extent', type=float, nargs=4, metavar=('XMIN', 'XMAX', 'YMIN', 'YMAX'),
+                        help="Охват сетки, по умолчанию — границы поля скважин")
+    parser.add_argument('--method', choices=METHODS, default='idw')
+    parser.add_argument('--neighbours', type=int, default=8, help="Число соседних скважин для idw")
+    parser.add_argument('--power', type=float, default=2, help="Степень расстояния для idw")
+    parser.add_argument('--output', default='heads', help="Каталог для сеток")
+    parser.add_argument('--stack', help="Записать все сетки в один многоканальный GeoTIFF вместо CSV")
+    parser.add_argument('--batch', type=int, default=256, help="Timestamp на одно умножение матрицы")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from store import load_store
+    from wells import WellTable
+
+    args = parse_args(argv)
+    store = load_store(args.csv)
+    wells = WellTable.from_csv(args.wells).reorder(store.well_columns)
+    extent = args.extent or wells.bounds(padding=0)
+    shape = tuple(args.shape)
+
+    options = {'neighbours': args.neighbours, 'power': args.power} if args.method == 'idw' else {}
+    gridder = Gridder(wells.xy, grid_points(extent, shape), args.method, **options)
+
+    if args.stack:
+        from geotiff import GeoTiffStack  # GDAL нужен только для стека
+
+        with GeoTiffStack(args.stack, shape, extent, len(store)) as stack:
+            for timestamp, frame in iter_grids(gridder, store, shape, args.batch):
+                stack.append(frame, timestamp, timestamp=timestamp)
+        print(f"Сохранен стек сеток: {args.stack}")
+        return
+
+    os.makedirs(args.output, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(args.csv))[0]
+    for timestamp, frame in iter_grids(gridder, store, shape, args.batch):
+        save_grid_csv(os.path.join(args.output, f'{stem}_{timestamp}.csv'), frame)
+    print(f"Сохранено сеток: {len(store)} в {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Сетка напоров с пропусками.
+
+В файлах сеток узлы без данных записаны значением-заменителем: 9999 в CSV
+(feb10head.csv), -1 в JSON-выгрузках. HeadGrid хранит значения в float32, а
+узлы без данных — как NaN, поэтому их не нужно подменять "безопасными"
+числами: matplotlib оставляет на их месте дыры, а границы шкалы считаются
+за O(n) функциями nanmin/nanmax/nanpercentile без сортировки всей сетки.
+
+.npy и GeoTIFF открываются через memory-map: значения — представление
+float32 файла без копий в памяти. CSV и JSON при первом чтении один раз
+переводятся в .npy рядом с исходным файлом (data.csv.grid.cache, см.
+csvcache.py) и дальше открываются так же.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from csvcache import cache_dir, is_fresh, read_bundle, write_bundle
+
+# Значение "нет данных" в CSV-сетках напоров
+NODATA = 9999
+
+# Значения "нет данных" в JSON-сетках: -1 в исходной выгрузке, 9999 после сохранения из скриптов карт
+JSON_NODATA = (-1, NODATA)
+
+
+def grid_axes(shape, extent):
+    """Оси x (по столбцам) и y (по строкам) сетки shape = (rows, cols) и охвата (xmin, xmax, ymin, ymax).
+
+    Одномерные оси вместо полных X, Y из meshgrid: contourf принимает их как есть.
+    Ориентация осей как в скриптах карт: x убывает по столбцам, y растет по строкам.
+    """
+    xmin, xmax, ymin, ymax = extent
+    rows, cols = shape
+    return np.linspace(xmax, xmin, num=cols), np.linspace(ymin, ymax, num=rows)
+
+
+class HeadGrid:
+    """Сетка напоров float32 (rows x cols); узлы без данных — NaN."""
+
+    def __init__(self, values, nodata=NODATA):
+        self.values = np.array(values, dtype=np.float32)
+        if self.values.ndim != 2:
+            raise ValueError(f"Сетка должна быть двумерной, получено измерений: {self.values.ndim}.")
+        self.values[np.isin(self.values, np.atleast_1d(nodata))] = np.nan
+
+    @classmethod
+    def wrap(cls, values):
+        """Сетка поверх готового массива с NaN вместо пропусков, без копии (если он уже float32)."""
+        grid = cls.__new__(cls)
+        grid.values = values if values.dtype == np.float32 else values.astype(np.float32)
+        if grid.values.ndim != 2:
+            raise ValueError(f"Сетка должна быть двумерной, получено измерений: {grid.values.ndim}.")
+        return grid
+
+    @classmethod
+    def read(cls, file_path, use_cache=True):
+        """Открывает сетку из .npy, GeoTIFF, CSV без заголовка или JSON-массива.
+
+        .npy (пропуски — NaN) и GeoTIFF открываются через memory-map; CSV и JSON
+        разбираются один раз и кэшируются в float32 .npy. Значения сеток из
+        memory-map доступны только для чтения.
+        """
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == '.npy':
+            return cls.wrap(np.load(file_path, mmap_mode='r'))
+        if extension in ('.tif', '.tiff'):
+            return cls.read_geotiff(file_path)
+        if not use_cache:
+            return cls.parse(file_path)
+
+        directory = cache_dir(file_path, 'grid')
+        if not is_fresh(directory, file_path):
+            grid = cls.parse(file_path)
+            try:
+                write_bundle(directory, file_path, {'values': grid.values})
+            except OSError:
+                return grid  # Кэш необязателен: каталог может быть только для чтения
+        return cls.wrap(read_bundle(directory, ['values'])['values'])
+
+    @classmethod
+    def parse(cls, file_path):
+        """Разбирает текстовую сетку: CSV без заголовка или JSON-массив."""
+        if file_path.endswith('.json'):
+            with open(file_path) as f:
+                return cls(json.load(f), nodata=JSON_NODATA)
+        return cls(pd.read_csv(file_path, header=None, dtype=np.float32).to_numpy())
+
+    @classmethod
+    def read_geotiff(cls, file_path, band=1):
+        """Канал GeoTIFF через виртуальную память GDAL.
+
+        Несжатый файл отображается в память напрямую; сжатый или тайловый
+        (так пишут export_geotiff и GeoTiffStack) GDAL отобразить не может, и
+        он читается целиком. Числовой nodata канала заменяется на NaN (с
+        копией). Растр (северный край сверху) поворачивается в ориентацию
+        grid_axes представлением, без копии.
+        """
+        from osgeo import gdal, gdal_array
+
+        from geotiff import open_raster, raster_band, read_array
+
+        dataset = open_raster(file_path)
+        raster = raster_band(dataset, band)
+        # Отказ отображения GDAL сообщает исключением или, без gdal.UseExceptions(), возвращаемым None
+        try:
+            virtual_memory = raster.GetVirtualMemAuto(gdal.GF_Read)
+        except RuntimeError:
+            virtual_memory = None
+        if virtual_memory is not None:
+            values = gdal_array.VirtualMemGetArray(virtual_memory)
+        else:
+            values = read_array(raster)
+
+        nodata = raster.GetNoDataValue()
+        if nodata is not None and not np.isnan(nodata):
+            values = np.where(values == nodata, np.float32(np.nan), values).astype(np.float32)
+        grid = cls.wrap(values[::-1, ::-1])
+        grid.dataset = dataset  # Отображение живет, пока открыт набор данных
+        return grid
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def mask(self):
+        """True в узлах без данных."""
+        return np.isnan(self.values)
+
+    def masked(self):
+        """Маскированный массив для функций, которые не пропускают NaN сами."""
+        return np.ma.masked_invalid(self.values)
+
+    def filled(self, nodata=NODATA):
+        """Копия значений с заменителем nodata вместо NaN, для записи в файлы."""
+        return np.where(self.mask, np.float32(nodata), self.values)
+
+    def color_limits(self, percentiles=None):
+        """Границы цветовой шкалы по узлам с данными (см. color_limits)."""
+        return color_limits(self.values, percentiles)
+
+
+def color_limits(values, percentiles=None):
+    """Границы цветовой шкалы по значениям без NaN.
+
+    По умолчанию минимум и максимум; percentiles = (low, high) отсекает
+    выбросы по процентилям (np.nanpercentile, частичная сортировка за O(n)).
+    """
+    if np.isnan(values).all():
+        raise ValueError("В сетке нет данных.")
+    if percentiles is None:
+        return float(np.nanmin(values)), float(np.nanmax(values))
+    low, high = np.nanpercentile(values, percentiles)
+    return float(low), float(high)
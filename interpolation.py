@@ -0,0 +1,103 @@
+import numpy as np
+
+
+class FrameInterpolator:
+    """Промежуточные кадры между соседними Timestamp для плавной анимации.
+
+    Между каждой парой Timestamp вставляется substeps кадров. Уровни всех скважин
+    считаются векторно и лениво, только для запрошенного кадра: в памяти держатся
+    лишь строки текущего интервала. Методы: 'linear' и 'pchip' (монотонный
+    кубический Эрмит, без выбросов за пределы соседних значений).
+    """
+
+    METHODS = ('linear', 'pchip')
+
+    def __init__(self, store, substeps=0, method='linear'):
+        if method not in self.METHODS:
+            raise ValueError(f"Неизвестный метод интерполяции: {method}.")
+        self.store = store
+        self.substeps = int(substeps)
+        self.method = method
+        self.times = np.asarray(store.timestamps, dtype=np.float64)
+        self._interval = None  # (номер интервала, y0, y1, m0, m1) последнего интервала
+
+    def __len__(self):
+        return (len(self.times) - 1) * (self.substeps + 1) + 1
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+    def __getitem__(self, k):
+        """Кадр k: (время, уровни всех скважин)."""
+        if not 0 <= k < len(self):
+            raise IndexError(k)
+        i, step = divmod(k, self.substeps + 1)
+        if step == 0:
+            return self.times[i], self.node(i)
+
+        t = step / (self.substeps + 1)
+        y0, y1, m0, m1 = self.interval(i)
+        h = self.times[i + 1] - self.times[i]
+        time = self.times[i] + t * h
+        if self.method == 'linear':
+            return time, y0 + t * (y1 - y0)
+
+        # Базисные функции Эрмита на отрезке [0, 1]
+        t2, t3 = t * t, t * t * t
+        h00 = 2 * t3 - 3 * t2 + 1
+        h10 = t3 - 2 * t2 + t
+        h01 = -2 * t3 + 3 * t2
+        h11 = t3 - t2
+        return time, h00 * y0 + h10 * h * m0 + h01 * y1 + h11 * h * m1
+
+    def node(self, i):
+        """Уровни скважин в Timestamp i (первая строка метки)."""
+        return np.asarray(self.store.wells[self.store.offsets[i]], dtype=np.float64)
+
+    def interval(self, i):
+        """Значения и наклоны на концах интервала i; кэшируются для всех его подкадров."""
+        if self._interval is not None and self._interval[0] == i:
+            return self._interval[1:]
+
+        y0, y1 = self.node(i), self.node(i + 1)
+        if self.method == 'linear':
+            m0 = m1 = None
+        else:
+            m0, m1 = self.slope(i, y0, y1), self.slope(i + 1, y0, y1)
+        self._interval = (i, y0, y1, m0, m1)
+        return y0, y1, m0, m1
+
+    def slope(self, k, y0, y1):
+        """Наклон PCHIP в узле k (формула Фрича–Карлсона, как в scipy.interpolate.PchipInterpolator)."""
+        n = len(self.times)
+        if n == 2:
+            return (y1 - y0) / (self.times[1] - self.times[0])
+
+        if k == 0:
+            return self._edge_slope(0, 1, 2)
+        if k == n - 1:
+            return self._edge_slope(n - 1, n - 2, n - 3)
+
+        h0 = self.times[k] - self.times[k - 1]
+        h1 = self.times[k + 1] - self.times[k]
+        d0 = (self.node(k) - self.node(k - 1)) / h0
+        d1 = (self.node(k + 1) - self.node(k)) / h1
+
+        # Взвешенное гармоническое среднее; при смене знака или плато наклон нулевой
+        w0, w1 = 2 * h1 + h0, h1 + 2 * h0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            m = (w0 + w1) / (w0 / d0 + w1 / d1)
+        flat = (np.sign(d0) != np.sign(d1)) | (d0 == 0) | (d1 == 0)
+        return np.where(flat, 0.0, m)
+
+    def _edge_slope(self, k, k1, k2):
+        """Односторонний трехточечный наклон на краю ряда с ограничениями монотонности."""
+        h0 = self.times[k1] - self.times[k]
+        h1 = self.times[k2] - self.times[k1]
+        d0 = (self.node(k1) - self.node(k)) / h0
+        d1 = (self.node(k2) - self.node(k1)) / h1
+        m = ((2 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+        m = np.where(np.sign(m) != np.sign(d0), 0.0, m)
+        overshoot = (np.sign(d0) != np.sign(d1)) & (np.abs(m) > 3 * np.abs(d0))
+        return np.where(overshoot, 3 * d0, m)
@@ -1,11 +1,23 @@
+import queue
+import threading
 import tkinter as tk
-from tkinter import filedialog, messagebox
-import pandas as pd
+from tkinter import filedialog, messagebox, ttk
+import numpy as np
 from pyVistaPlot import Plot
+from render import FrameRenderer
+from store import LoadCancelled, load_store
+from wells import WellTable
+
+LOAD_POLL_MS = 100  # Период опроса фоновой загрузки
+MAX_LISTED_TIMESTAMPS = 1000  # Сколько Timestamp показывать в списке одновременно
 
 class Main:
     def __init__(self):
-        self.data = None  # DataFrame для хранения данных
+        self.store = None  # Индекс данных по Timestamp
+        self.timestamp_labels = np.array([], dtype=str)  # Подписи всех Timestamp для поиска
+        self.cancel_event = None  # Флаг отмены текущей фоновой загрузки
+        self.load_queue = None  # Сообщения от фонового потока загрузки
+        self.well_table = None  # Координаты скважин
         self.plot = Plot()  # Класс для работы с 3D графикой
 
         # Создание главного окна
@@ -24,19 +36,51 @@ class Main:
         self.select_file_button = tk.Button(self.left_frame, text="Выбрать файл", command=self.load_file)
         self.select_file_button.pack(pady=5)
 
-        # Опции для выбора Timestamp
+        # Кнопка выбора таблицы координат скважин
+        self.select_wells_button = tk.Button(self.left_frame, text="Координаты скважин", command=self.load_wells)
+        self.select_wells_button.pack(pady=5)
+
+        # Индикатор и отмена фоновой загрузки
+        self.progress = ttk.Progressbar(self.left_frame, maximum=1.0, length=160)
+        self.progress.pack(pady=5)
+        self.cancel_button = tk.Button(self.left_frame, text="Отмена", command=self.cancel_loading, state="disabled")
+        self.cancel_button.pack(pady=5)
+
+        # Поиск и выбор Timestamp: в списке только совпадения с начала строки
         self.timestamp_var = tk.StringVar()
-        self.timestamp_menu = tk.OptionMenu(self.left_frame, self.timestamp_var, "")
-        self.timestamp_menu.pack(pady=5)
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *_: self.filter_timestamps())
+        self.search_entry = tk.Entry(self.left_frame, textvariable=self.search_var)
+        self.search_entry.pack(pady=5)
+
+        self.timestamp_frame = tk.Frame(self.left_frame)
+        self.timestamp_frame.pack(pady=5)
+        self.timestamp_list = tk.Listbox(self.timestamp_frame, height=10, exportselection=False)
+        self.timestamp_scroll = tk.Scrollbar(self.timestamp_frame, command=self.timestamp_list.yview)
+        self.timestamp_list.config(yscrollcommand=self.timestamp_scroll.set)
+        self.timestamp_list.pack(side="left")
+        self.timestamp_scroll.pack(side="right", fill="y")
+        self.timestamp_list.bind("<<ListboxSelect>>", self.select_timestamp)
 
         # Кнопка для создания 3D модели
         self.create_graph_button = tk.Button(self.left_frame, text="Создать 3D модель", command=self.create_3d_model)
         self.create_graph_button.pack(pady=5)
 
+        # Число промежуточных кадров между Timestamp для плавной анимации
+        self.substeps_label = tk.Label(self.left_frame, text="Промежуточные кадры", bg='lightgray')
+        self.substeps_label.pack()
+        self.substeps_var = tk.IntVar(value=4)
+        self.substeps_spinbox = tk.Spinbox(self.left_frame, from_=0, to=60, width=5, textvariable=self.substeps_var)
+        self.substeps_spinbox.pack(pady=5)
+
         # Кнопка для анимации Timestamp
         self.animate_button = tk.Button(self.left_frame, text="Анимация", command=self.animate_model)
         self.animate_button.pack(pady=5)
 
+        # Кнопка экспорта анимации в видео
+        self.video_button = tk.Button(self.left_frame, text="Экспорт видео", command=self.export_video)
+        self.video_button.pack(pady=5)
+
         # Кнопка сохранения
         self.save_button = tk.Button(self.left_frame, text="Сохранить модель", command=self.save_model)
         self.save_button.pack(pady=5)
@@ -44,24 +88,109 @@ class Main:
         self.root.mainloop()
 
     def load_file(self):
-        """Загрузка CSV файла с данными."""
+        """Загрузка CSV файла с данными в фоновом потоке."""
+        file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
+        if not file_path:
+            return
+
+        self.cancel_loading()
+        self.cancel_event = threading.Event()
+        self.load_queue = queue.Queue()
+        self.progress['value'] = 0
+        self.cancel_button.config(state="normal")
+        self.select_file_button.config(state="disabled")
+
+        worker = threading.Thread(
+            target=self.load_worker, args=(file_path, self.cancel_event, self.load_queue), daemon=True
+        )
+        worker.start()
+        self.root.after(LOAD_POLL_MS, self.poll_loading, self.load_queue)
+
+    def load_worker(self, file_path, cancel_event, results):
+        """Читает файл вне главного потока; с Tk общается только через очередь."""
+        try:
+            store = load_store(
+                file_path,
+                progress=lambda fraction: results.put(("progress", fraction)),
+                cancelled=cancel_event.is_set
+            )
+            results.put(("done", store))
+        except LoadCancelled:
+            results.put(("cancelled", None))
+        except Exception as e:
+            results.put(("error", e))
+
+    def poll_loading(self, results):
+        """Забирает сообщения фоновой загрузки в главном потоке Tk."""
+        if results is not self.load_queue:
+            return  # Загрузка была отменена или заменена новой
+        try:
+            while True:
+                kind, value = results.get_nowait()
+                if kind == "progress":
+                    self.progress['value'] = value
+                    continue
+
+                self.finish_loading()
+                if kind == "done":
+                    self.store = value
+                    self.apply_well_table()
+                    self.timestamp_labels = self.store.timestamps.astype(str)
+                    self.timestamp_var.set('')
+                    self.filter_timestamps()
+                elif kind == "error":
+                    messagebox.showerror("Ошибка", f"Не удалось загрузить файл: {value}")
+                return
+        except queue.Empty:
+            self.root.after(LOAD_POLL_MS, self.poll_loading, results)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось загрузить файл: {e}")
+
+    def cancel_loading(self):
+        """Отменяет текущую фоновую загрузку, если она идет."""
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        self.finish_loading()
+
+    def finish_loading(self):
+        """Возвращает элементы загрузки в исходное состояние."""
+        self.cancel_event = None
+        self.load_queue = None
+        self.progress['value'] = 0
+        self.cancel_button.config(state="disabled")
+        self.select_file_button.config(state="normal")
+
+    def filter_timestamps(self):
+        """Показывает в списке Timestamp, начинающиеся с текста поиска."""
+        prefix = self.search_var.get().strip()
+        labels = self.timestamp_labels
+        if prefix:
+            labels = labels[np.char.startswith(labels, prefix)]
+
+        self.timestamp_list.delete(0, 'end')
+        self.timestamp_list.insert('end', *labels[:MAX_LISTED_TIMESTAMPS])
+
+    def select_timestamp(self, event=None):
+        """Запоминает Timestamp, выбранный в списке."""
+        selection = self.timestamp_list.curselection()
+        if selection:
+            self.timestamp_var.set(self.timestamp_list.get(selection[0]))
+
+    def load_wells(self):
+        """Загрузка CSV файла с координатами скважин (Well, X, Y, Collar)."""
         file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
         if file_path:
             try:
-                self.data = pd.read_csv(file_path)
-                timestamps = self.data['Timestamp'].unique()
-
-                # Обновление меню выбора Timestamp
-                self.timestamp_menu['menu'].delete(0, 'end')
-                self.timestamp_var.set('')
-
-                for timestamp in timestamps:
-                    self.timestamp_menu['menu'].add_command(
-                        label=str(timestamp),
-                        command=tk._setit(self.timestamp_var, str(timestamp))
-                    )
+                self.well_table = WellTable.from_csv(file_path)
+                self.apply_well_table()
             except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось загрузить файл: {e}")
+                messagebox.showerror("Ошибка", f"Не удалось загрузить координаты скважин: {e}")
+
+    def apply_well_table(self):
+        """Передает координаты скважин в порядке колонок загруженных данных."""
+        if self.well_table is None or self.store is None:
+            return
+        self.plot.well_table = self.well_table.reorder(self.store.well_columns)
 
     def create_3d_model(self):
         """Создание 3D модели для выбранного Timestamp."""
@@ -74,8 +203,8 @@ class Main:
 
         try:
             # Фильтрация данных и создание графика
-            filtered_data = self.plot.filter_data(self.data, timestamp)
-            self.plot.make_3d_graph(*filtered_data)
+            filtered_data = self.plot.filter_data(self.store, timestamp)
+            self.plot.make_3d_graph(*filtered_data, well_columns=self.store.well_columns)
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось создать модель: {e}")
 
@@ -84,13 +213,32 @@ class Main:
         if not self.data_is_loaded():
             return
 
-        for timestamp in self.data['Timestamp'].unique():
+        try:
+            self.plot.animate(self.store, substeps=self.substeps_var.get(), method='pchip')
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Анимация прервана: {e}")
+
+    def export_video(self):
+        """Экспорт анимации по всем Timestamp в видео или GIF."""
+        if not self.data_is_loaded():
+            return
+
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".mp4", filetypes=[("MP4 video", "*.mp4"), ("GIF", "*.gif")]
+        )
+        if not file_path:
+            return
+
+        try:
+            # Внеэкранная сцена: кадры идут из буфера рендера прямо в кодировщик
+            renderer = FrameRenderer(self.store, self.well_table)
             try:
-                filtered_data = self.plot.filter_data(self.data, timestamp)
-                self.plot.make_3d_graph(*filtered_data)
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Анимация прервана: {e}")
-                break
+                renderer.write_movie(self.store.timestamps, file_path, substeps=self.substeps_var.get(), method='pchip')
+            finally:
+                renderer.close()
+            messagebox.showinfo("Успех", "Видео успешно сохранено!")
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить видео: {e}")
 
     def save_model(self):
         """Сохранение текущей 3D модели в файл."""
@@ -102,7 +250,7 @@ class Main:
 
     def data_is_loaded(self):
         """Проверка, загружены ли данные."""
-        if self.data is None:
+        if self.store is None:
             messagebox.showwarning("Ошибка", "Загрузите данные перед продолжением.")
             return False
         return True
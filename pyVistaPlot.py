@@ -1,107 +1,244 @@
 import pyvista as pv
 import numpy as np
-import time
 
-class Plot:
-    def __init__(self):
-        self.plotter = pv.Plotter()
+from geometry import LevelOfDetail, PiezometricSurface, WellGlyphs, layer_mesh, well_colors
+from interpolation import FrameInterpolator
+from wells import WellTable
 
-    def filter_data(self, data, timestamp):
-        """Фильтрует данные по выбранному Timestamp."""
-        timestamp_filtered = data[data['Timestamp'] == timestamp]
+# Почвенные слои сверху вниз
+LAYERS = [
+    {'name': 'Organic', 'height': 2, 'color': 'brown', 'opacity': 0.9},
+    {'name': 'Surface', 'height': 3, 'color': 'green', 'opacity': 0.5},
+    {'name': 'Subsoil', 'height': 4, 'color': 'sandybrown', 'opacity': 0.7},
+    {'name': 'Unconfined Aquifer', 'height': 5, 'color': 'lightblue', 'opacity': 0.6},
+    {'name': 'Confined Layer', 'height': 4, 'color': 'gray', 'opacity': 0.9},
+    {'name': 'Bedrock', 'height': 6, 'color': 'black', 'opacity': 0.9}
+]
 
-        if timestamp_filtered.empty:
-            raise ValueError(f"Нет данных для timestamp {timestamp}.")
+# Границы почвенных слоев без реальных координат скважин
+LAYER_BOUNDS = (-30, 30, -30, 30)
 
-        # Извлечение координат X и Y (предполагаем, что они одинаковые для всех скважин)
-        x_coordinate = timestamp_filtered['Xpos'].values[0]
-        y_coordinate = timestamp_filtered['Ypos'].values[0]
+# Уровни детализации от грубого к подробному: разрешение кровли слоев и цилиндров скважин
+SURFACE_RESOLUTIONS = (8, 16, 30)
+WELL_RESOLUTIONS = (6, 10, 16)
+
+WELL_COLORS = ['blue', 'cyan', 'purple', 'red', 'orange', 'yellow', 'green', 'pink', 'brown', 'gray']
+
+
+class Plot:
+    def __init__(self, off_screen=False, window_size=None):
+        self.off_screen = off_screen  # Рендер без окна, для пакетной работы на сервере
+        self.window_size = window_size
+        self.plotter = self.new_plotter()
+        self.well_table = None  # Координаты скважин (WellTable), если загружены
+        self.surface_seed = 0  # Зерно рельефа слоев: одинаковый рельеф во всех кадрах
+        self.surface_cache_dir = None  # Каталог для кэша рельефа на диске (необязательно)
+        self.wells = None
+        self.well_casings = None
+        self.water_columns = None
+        self.piezometric_surface = None
+        self.last_z_coordinates = None
+        self.frame_budget = 1 / 30  # Бюджет времени кадра для выбора уровня детализации
+        self.confined_layer_depth = 0
+        self.unconfined_layer_depth = 0
+
+    def filter_data(self, store, timestamp):
+        """Возвращает данные выбранного Timestamp из индекса TimestampStore (срез без копирования)."""
+        rows = store.rows(timestamp)
 
-        # Получение глубин для всех скважин (колонки Well1, Well2, ..., Well10)
-        z_values = timestamp_filtered[['Well1', 'Well2', 'Well3', 'Well4', 'Well5',
-                                       'Well6', 'Well7', 'Well8', 'Well9', 'Well10']].values
+        # Извлечение координат X и Y (предполагаем, что они одинаковые для всех скважин)
+        x_coordinate = store.xpos[rows.start]
+        y_coordinate = store.ypos[rows.start]
 
-        # Транспонируем для удобства работы, чтобы каждая скважина была отдельной строкой
-        z_coordinates = z_values.T
+        # Транспонированное представление: каждая скважина — отдельная строка
+        z_coordinates = store.wells[rows].T
         n_wells = z_coordinates.shape[0]  # Количество скважин
 
         return x_coordinate, y_coordinate, z_coordinates, n_wells
 
-    def make_3d_graph(self, x_coordinate, y_coordinate, z_coordinates, n_wells):
+    def make_3d_graph(self, x_coordinate, y_coordinate, z_coordinates, n_wells, well_columns=None):
         """Создание 3D модели скважин с реалистичными почвенными слоями"""
+        self.build_scene(self.well_layout(x_coordinate, y_coordinate, n_wells, well_columns))
+        self.update_wells(z_coordinates)
 
-        # Определение слоев почвы
-        layers = [
-            {'name': 'Organic', 'height': 2, 'color': 'brown', 'opacity': 0.9},
-            {'name': 'Surface', 'height': 3, 'color': 'green', 'opacity': 0.5},
-            {'name': 'Subsoil', 'height': 4, 'color': 'sandybrown', 'opacity': 0.7},
-            {'name': 'Unconfined Aquifer', 'height': 5, 'color': 'lightblue', 'opacity': 0.6},
-            {'name': 'Confined Layer', 'height': 4, 'color': 'gray', 'opacity': 0.9},
-            {'name': 'Bedrock', 'height': 6, 'color': 'black', 'opacity': 0.9}
-        ]
+        # Показ модели; окно не закрывается, чтобы модель можно было сохранить
+        self.plotter.show(interactive=True, auto_close=False)
+
+    def animate(self, store, fps=30, substeps=0, method='linear'):
+        """Анимация по всем Timestamp: геология строится один раз, далее обновляются только скважины.
+
+        substeps промежуточных кадров между соседними Timestamp считаются лениво (FrameInterpolator).
+        """
+        frames = FrameInterpolator(store, substeps, method)
+        x_coordinate, y_coordinate, _, n_wells = self.filter_data(store, store.timestamps[0])
+        clim = self.color_limits(store)
+        self.build_scene(self.well_layout(x_coordinate, y_coordinate, n_wells, store.well_columns), clim=clim)
+        self.update_wells(frames[0][1][:, None])
+
+        def step(i):
+            # Таймер VTK вызывает шаги подряд, начиная с нуля
+            if i < len(frames):
+                self.move_wells(*self.timestamp_position(store, i // (substeps + 1)))
+                self.update_wells(frames[i][1][:, None])
+                self.plotter.render()
+
+        self.plotter.add_timer_event(max_steps=len(frames), duration=max(1, int(1000 / fps)), callback=step)
+        self.plotter.show(interactive=True, auto_close=False)
+
+    def new_plotter(self):
+        """Создает окно PyVista (или внеэкранный буфер) с настройками Plot"""
+        return pv.Plotter(off_screen=self.off_screen, window_size=self.window_size)
 
-        current_depth = 0
-        confined_layer_depth = 0  # Будет обновлено позже
-        unconfined_layer_depth = 0  # Будет обновлено позже
+    def timestamp_position(self, store, i):
+        """Xpos и Ypos i-го Timestamp индекса (по первой строке метки)"""
+        row = store.offsets[i]
+        return store.xpos[row], store.ypos[row]
 
-        # Создаем и добавляем каждый слой почвы как объемный параллелепипед с вариацией в высоте поверхности
-        for layer in layers:
-            # Создание текстурированного верхнего слоя
-            plane_resolution = 30  # Определяем разрешение плоскости (большее значение создаст больше точек)
-            top_surface = pv.Plane(center=(0, 0, current_depth), i_size=60, j_size=60, i_resolution=plane_resolution, j_resolution=plane_resolution)
+    def move_wells(self, x_coordinate, y_coordinate):
+        """Переносит раскладку в ряд к Xpos и Ypos кадра, сдвигая меши скважин на месте.
 
-            # Генерация вариации высоты для каждого узла поверхности
-            height_variation = np.random.uniform(-0.5, 0.5, top_surface.points.shape[0])
-            top_surface.points[:, 2] += height_variation
+        Загруженные координаты скважин (well_table) от Xpos и Ypos не зависят.
+        Уровни воды и поверхность пересчитывает следующий вызов update_wells.
+        """
+        if self.well_table is not None:
+            return
+        wells = WellTable.default_layout(self.wells.ids, x_coordinate, y_coordinate)
+        dx, dy = wells.xy[0] - self.wells.xy[0]
+        if dx == 0 and dy == 0:
+            return
+        for glyphs in self.casing_levels + self.water_levels:
+            glyphs.translate(dx, dy)
+        self.wells = wells
+        self.piezometric_surface.move_wells(wells.xy)
 
-            # Создание куба для слоя почвы
-            bottom_z = current_depth - layer['height']
-            cube = pv.Box(bounds=(-30, 30, -30, 30, bottom_z, current_depth))
+    def color_limits(self, store):
+        """Диапазон уровней воды по всему ряду, из сводки индекса без чтения всей матрицы"""
+        return float(np.nanmin(store.well_min)), float(np.nanmax(store.well_max))
 
-            # Добавление слоя и верхней поверхности
-            self.plotter.add_mesh(cube, color=layer['color'], opacity=layer['opacity'], label=layer['name'])
-            self.plotter.add_mesh(top_surface, color=layer['color'], opacity=layer['opacity'] + 0.1)
+    def well_layout(self, x_coordinate, y_coordinate, n_wells, well_columns=None):
+        """Таблица скважин для сцены: загруженные координаты или прежняя раскладка в ряд.
 
-            # Обновляем переменные глубины
-            if layer['name'] == 'Confined Layer':
-                confined_layer_depth = current_depth
-            if layer['name'] == 'Unconfined Aquifer':
-                unconfined_layer_depth = current_depth
+        В раскладке в ряд скважины называются по колонкам данных (well_columns), если они известны.
+        """
+        if self.well_table is None:
+            ids = list(well_columns) if well_columns is not None else [f'Well{i + 1}' for i in range(n_wells)]
+            return WellTable.default_layout(ids, x_coordinate, y_coordinate)
+        if len(self.well_table) != n_wells:
+            raise ValueError(f"Таблица скважин содержит {len(self.well_table)} скважин, в данных {n_wells}.")
+        return self.well_table
 
-            current_depth = bottom_z
+    def build_scene(self, wells, clim=None):
+        """Строит статическую сцену: почвенные слои, обсадку и столбы воды скважин, легенду.
 
-        # Создаем смещение для каждой скважины, чтобы они не были в одной точке
-        offsets = np.linspace(-25, 25, n_wells)  # Расширяем интервал между скважинами
+        Число актеров постоянно: один меш геологии и по одному мешу на обсадку и столбы воды.
+        """
+        # Предыдущая сцена закрывается целиком, чтобы актеры не накапливались
+        self.plotter.close()
+        self.plotter = self.new_plotter()
 
-        colors = ['blue', 'cyan', 'purple', 'red', 'orange', 'yellow', 'green', 'pink', 'brown', 'gray']
+        # Все слои почвы — один меш с цветом и прозрачностью по ячейкам
+        # Для реальных координат геология растягивается на все поле скважин
+        bounds = wells.bounds() if self.well_table is not None else LAYER_BOUNDS
+        self.layer_levels = []
+        for resolution in SURFACE_RESOLUTIONS:
+            layers, tops = layer_mesh(LAYERS, plane_resolution=resolution, bounds=bounds,
+                                      seed=self.surface_seed, cache_dir=self.surface_cache_dir)
+            self.layer_levels.append(layers)
+        self.confined_layer_depth = tops['Confined Layer']
+        self.unconfined_layer_depth = tops['Unconfined Aquifer']
+        self.layer_actor = self.plotter.add_mesh(self.layer_levels[-1], scalars='rgba', rgba=True)
 
-        for i in range(n_wells):
-            z_value = z_coordinates[i][0]
-            if np.isnan(z_value):
-                print(f"Недостаточно данных для отображения скважины {i + 1}, пропуск.")
-                continue
+        self.wells = wells
+        self.create_wells(wells, clim)
 
-            # Ограничиваем глубину скважин уровнем между confined и unconfined aquifer слоями
-            self.create_well(
-                x_coordinate + offsets[i], y_coordinate, confined_layer_depth, colors[i % len(colors)]
-            )
+        # Пьезометрическая поверхность по уровням всех скважин, окрашенная по значению
+        self.piezometric_surface = PiezometricSurface(wells, bounds)
+        self.plotter.add_mesh(
+            self.piezometric_surface.mesh, scalars='Уровень воды', cmap='viridis', clim=clim, opacity=0.8,
+            scalar_bar_args={'title': 'Уровень воды'}
+        )
+        self.add_legend(len(wells))
 
-        self.add_legend(colors)
+        # Щелчок по сцене выбирает ближайшую скважину через KD-дерево
+        if not self.off_screen:
+            self.plotter.enable_point_picking(callback=self.on_pick, show_message=False, show_point=False)
 
-        # Показ модели и запуск анимации дождя и инфильтрации
-        self.plotter.show(interactive=True)
+        # Уровень детализации пересчитывается после каждого кадра. RenderEvent рендерер не посылает,
+        # поэтому наблюдается окончание отрисовки окна. Внеэкранные кадры и видео всегда рисуются
+        # с полной детализацией, чтобы результат не зависел от загрузки машины
+        self.detail = len(SURFACE_RESOLUTIONS) - 1
+        self.level_of_detail = LevelOfDetail(len(SURFACE_RESOLUTIONS), frame_budget=self.frame_budget)
+        if not self.off_screen:
+            self.plotter.render_window.AddObserver('EndEvent', lambda *_: self.update_level_of_detail(self.plotter))
 
-    def create_well(self, x, y, confined_depth, color):
-        """Создает визуализацию скважины как цилиндр, пронизывающий верхние слои, но не ниже confined слоя"""
-        # Высота скважины должна доходить до верхнего слоя и не заходить глубже ограниченного слоя (confined layer)
-        well_height = abs(confined_depth)
+    def update_wells(self, z_coordinates):
+        """Обновляет уровни воды во всех скважинах на месте одной векторной операцией"""
+        self.last_z_coordinates = z_coordinates
+        levels = z_coordinates[:, 0]
+        missing = np.isnan(levels)
 
-        # Создаем цилиндр для скважины, направленный вниз от поверхности
-        well_cylinder = pv.Cylinder(center=(x, y, confined_depth / 2), radius=0.5, height=well_height, direction=(0, 0, -1))
-        self.plotter.add_mesh(well_cylinder, color=color, opacity=0.9, label=f'Well {color}')
+        # Скважины без данных схлопываются в нулевую высоту вместо удаления актеров
+        casing_top = np.where(missing, self.confined_layer_depth, self.wells.collar)
+        water_top = np.where(missing, self.confined_layer_depth, levels)
+        self.well_casings.set_heights(self.confined_layer_depth, casing_top)
+        self.water_columns.set_heights(self.confined_layer_depth, water_top)
+        self.water_columns.set_scalars('Уровень воды', np.nan_to_num(levels, nan=self.confined_layer_depth))
+        self.piezometric_surface.update(levels)
 
-    def add_legend(self, colors):
-        """Добавляет легенду на график"""
+    def create_wells(self, wells, clim=None):
+        """Создает обсадку (от устья до confined слоя) и столбы воды всех скважин двумя мешами"""
+        colors = well_colors(len(wells), WELL_COLORS)
+        self.casing_levels = []
+        self.water_levels = []
+        for resolution in WELL_RESOLUTIONS:
+            casings = WellGlyphs(wells.x, wells.y, radius=0.5, resolution=resolution)
+            casings.set_cell_colors(colors)
+            casings.set_heights(self.confined_layer_depth, wells.collar)
+
+            # Столб воды чуть шире обсадки; высота задается в update_wells
+            water_columns = WellGlyphs(wells.x, wells.y, radius=0.55, resolution=resolution)
+            water_columns.set_scalars('Уровень воды', np.zeros(len(wells)))
+
+            self.casing_levels.append(casings)
+            self.water_levels.append(water_columns)
+
+        self.well_casings = self.casing_levels[-1]
+        self.water_columns = self.water_levels[-1]
+        self.casing_actor = self.plotter.add_mesh(self.well_casings.mesh, scalars='rgb', rgb=True, opacity=0.9)
+        self.water_actor = self.plotter.add_mesh(
+            self.water_columns.mesh, scalars='Уровень воды', cmap='Blues', clim=clim, opacity=0.6, show_scalar_bar=False
+        )
+
+    def update_level_of_detail(self, plotter):
+        """Выбирает уровень детализации по расстоянию камеры и времени последнего кадра"""
+        distance = np.linalg.norm(np.subtract(plotter.camera.position, plotter.camera.focal_point))
+        frame_time = plotter.renderer.GetLastRenderTimeInSeconds()
+        self.set_detail(self.level_of_detail.select(distance, plotter.renderer.length, frame_time))
+
+    def set_detail(self, detail):
+        """Подменяет меши актеров на заранее построенный уровень детализации"""
+        if detail == self.detail:
+            return
+        self.detail = detail
+        self.well_casings = self.casing_levels[detail]
+        self.water_columns = self.water_levels[detail]
+        self.layer_actor.mapper.dataset = self.layer_levels[detail]
+        self.casing_actor.mapper.dataset = self.well_casings.mesh
+        self.water_actor.mapper.dataset = self.water_columns.mesh
+
+        # Новый уровень получает текущие уровни воды; изменения видны со следующего кадра
+        if self.last_z_coordinates is not None:
+            self.update_wells(self.last_z_coordinates)
+
+    def on_pick(self, point):
+        """Подписывает скважину, ближайшую к выбранной точке"""
+        index = self.wells.pick(point)
+        level = self.water_columns.mesh.point_data['Уровень воды'][index * self.water_columns.n_template]
+        self.plotter.add_text(f"{self.wells.ids[index]}: {level:.2f}", position="lower_left",
+                              font_size=10, color="black", name="picked_well")
+
+    def add_legend(self, n_wells):
+        """Добавляет легенду на график; для больших полей скважины сводятся в одну строку"""
         legend_labels = [
             ("Organic", "brown"),
             ("Surface", "green"),
@@ -110,38 +247,73 @@ class Plot:
             ("Confined Layer", "gray"),
             ("Bedrock", "black")
         ]
-        legend_labels += [(f"Well ({color})", color) for color in colors]
+        if n_wells <= len(WELL_COLORS):
+            legend_labels += [(f"Well ({color})", color) for color in WELL_COLORS[:n_wells]]
+        else:
+            legend_labels.append((f"Wells ({n_wells})", "blue"))
 
         self.plotter.add_text("Well", position="upper_right", font_size=10, color="blue")
         self.plotter.add_legend(labels=legend_labels, bcolor="white")
 
-    def animate_rain_infiltration(self, unconfined_layer_depth):
-        """Создает анимацию дождя и инфильтрации воды на уровне Unconfined Aquifer"""
-        num_drops = 50  # Количество капель дождя
-        drop_radius = 0.3  # Радиус капли
-        rain_duration = 5  # Продолжительность дождя (в секундах)
+    def animate_rain_infiltration(self, unconfined_layer_depth=None, num_drops=100_000, rain_duration=5, fps=30):
+        """Создает анимацию дождя и инфильтрации воды до уровня Unconfined Aquifer.
 
-        # Генерация случайных позиций для капель дождя
-        x_positions = np.random.uniform(-25, 25, num_drops)
-        y_positions = np.random.uniform(-25, 25, num_drops)
+        Капли — одно облако точек; на каждом тике таймера все капли сдвигаются одной
+        операцией NumPy, а дошедшие до водоносного слоя возвращаются наверх.
+        Вызывается после build_scene и до show: анимацию ведет таймер окна, без sleep.
+        """
+        if unconfined_layer_depth is None:
+            unconfined_layer_depth = self.unconfined_layer_depth
+        drop_size = 3  # Размер капли в пикселях
         initial_height = 10  # Высота, с которой начинается падение капель
+        xmin, xmax, ymin, ymax = self.wells.bounds() if self.well_table is not None else LAYER_BOUNDS
+
+        # Генерация случайных позиций для капель дождя по всей высоте падения
+        rng = np.random.default_rng()
+        points = np.column_stack([
+            rng.uniform(xmin, xmax, num_drops),
+            rng.uniform(ymin, ymax, num_drops),
+            rng.uniform(unconfined_layer_depth, initial_height, num_drops),
+        ]).astype(np.float32)
+        rain = pv.PolyData(points)
+        self.plotter.add_mesh(rain, color='blue', opacity=0.5, point_size=drop_size,
+                              render_points_as_spheres=True, name='rain')
+
+        num_steps = int(rain_duration * fps)  # Количество шагов анимации
+        fall_height = initial_height - unconfined_layer_depth
+        step_height = fall_height / fps  # Капля проходит всю высоту за секунду
+        z = rain.points[:, 2]  # Представление координат капель, запись идет прямо в меш
+
+        def step(_):
+            np.subtract(z, step_height, out=z)
+            np.add(z, fall_height, out=z, where=z < unconfined_layer_depth)
+            rain.GetPoints().Modified()
+            self.plotter.render()
+
+        self.plotter.add_timer_event(max_steps=num_steps, duration=max(1, int(1000 / fps)), callback=step)
+
+    def write_movie(self, store, timestamps, filename, fps=30, substeps=0, method='linear'):
+        """Записывает анимацию построенной сцены прямо в видео (.mp4 и др.) или .gif.
+
+        Кадры берутся из буфера рендера и сразу уходят в кодировщик (imageio/ffmpeg),
+        промежуточные изображения на диск не пишутся. timestamps — непрерывный
+        диапазон индекса; между его метками вставляется substeps промежуточных кадров.
+        """
+        frames = FrameInterpolator(store, substeps, method)
+        first = int(np.searchsorted(store.timestamps, timestamps[0])) * (substeps + 1)
+        last = int(np.searchsorted(store.timestamps, timestamps[-1])) * (substeps + 1)
 
-        # Добавление капель и анимация их падения
-        rain_drops = []
-        for i in range(num_drops):
-            rain_drop = pv.Sphere(center=(x_positions[i], y_positions[i], initial_height), radius=drop_radius)
-            rain_actor = self.plotter.add_mesh(rain_drop, color='blue', opacity=0.5)
-            rain_drops.append((rain_drop, rain_actor))
-
-        # Анимация движения капель вниз
-        num_steps = 30  # Количество шагов анимации
-        for step in range(num_steps):
-            for rain_drop, rain_actor in rain_drops:
-                new_z = rain_drop.center[2] - (initial_height - unconfined_layer_depth) / num_steps
-                rain_drop.translate((0, 0, -new_z), inplace=True)
-                self.plotter.update_coordinates(rain_drop.points, render=False)
-            time.sleep(rain_duration / num_steps)
-            self.plotter.render()  # Обновление сцены для визуализации анимации
+        if str(filename).lower().endswith('.gif'):
+            self.plotter.open_gif(filename, fps=fps)
+        else:
+            self.plotter.open_movie(filename, framerate=fps)
+        try:
+            for k in range(first, last + 1):
+                self.move_wells(*self.timestamp_position(store, k // (substeps + 1)))
+                self.update_wells(frames[k][1][:, None])
+                self.plotter.write_frame()
+        finally:
+            self.plotter.mwriter.close()
 
     def save_current_model(self, filename="well_model.png"):
         """Сохраняет текущую модель в файл"""
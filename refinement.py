@@ -0,0 +1,303 @@
+"""Локальное сгущение сетки напоров: окнами вручную или квадродеревом.
+
+Окно уточнения — диапазон ячеек по строкам и столбцам и кратность деления:
+(row_start, row_end, col_start, col_end, factor). Ячейки окна по каждой оси
+делятся на factor частей, остальные остаются базовыми, так что получаются
+неравномерные оси (прямоугольная сетка с переменным шагом). Значения
+переносятся на новые оси векторной билинейной интерполяцией; узлы, у которых
+в интерполяции участвует узел без данных (NaN), тоже остаются без данных.
+
+Квадродерево (adaptive_refine) выбирает размер ячеек само: крупные блоки там,
+где напор почти не меняется, и мелкие — где градиент или кривизна больше
+порога. Результат — разреженная иерархическая сетка, число узлов которой
+зависит от детальности поля, а не от размера области; ее триангуляцию
+принимают tricontourf и PyVista.
+
+Пример:
+    python refinement.py contour/feb10head.csv --extent 32.455 32.507 34.730 34.767 --window 10 20 5 15 4 --output refined.png
+    python refinement.py contour/feb10head.csv --extent 32.455 32.507 34.730 34.767 --gradient 8 --curvature 2 --output adaptive.png
+"""
+import argparse
+
+import numpy as np
+from scipy.spatial import Delaunay
+
+from headgrid import HeadGrid, grid_axes
+
+
+def refine_positions(n, windows):
+    """Положения узлов оси из n узлов в единицах базовых индексов (дробные внутри окон).
+
+    windows — список (start, end, factor): ячейки [start, end) делятся на factor
+    частей; при пересечении окон берется наибольшая кратность.
+    """
+    factors = np.ones(n - 1, dtype=np.int64)
+    for start, end, factor in windows:
+        if not 0 <= start < end <= n - 1:
+            raise ValueError(f"Окно [{start}, {end}) вне оси из {n - 1} ячеек.")
+        factors[start:end] = np.maximum(factors[start:end], int(factor))
+
+    # Ячейка i дает factors[i] узлов: i, i + 1/f, ..., i + (f - 1)/f; последний узел оси добавляется отдельно
+    cells = np.repeat(np.arange(n - 1), factors)
+    first = np.repeat(np.cumsum(factors) - factors, factors)
+    positions = cells + (np.arange(len(cells)) - first) / np.repeat(factors, factors)
+    return np.append(positions, n - 1)
+
+
+def bilinear(values, rows, cols):
+    """Билинейные значения сетки values в дробных позициях (rows, cols).
+
+    rows и cols согласуются по правилам broadcasting: столбец и строка дают
+    всю сетку уточненных осей, два одномерных массива — отдельные точки.
+    """
+    rows, cols = np.broadcast_arrays(rows, cols)
+    r0 = np.clip(np.floor(rows).astype(np.int64), 0, values.shape[0] - 2)
+    c0 = np.clip(np.floor(cols).astype(np.int64), 0, values.shape[1] - 2)
+    tr, tc = rows - r0, cols - c0
+
+    result = np.zeros(rows.shape, dtype=np.float32)
+    for dr, dc, weight in ((0, 0, (1 - tr) * (1 - tc)), (0, 1, (1 - tr) * tc), (1, 0, tr * (1 - tc)), (1, 1, tr * tc)):
+        # Угол с нулевым весом не участвует, даже если в нем NaN
+        corner = values[r0 + dr, c0 + dc]
+        result += np.where(weight > 0, weight * corner, 0).astype(np.float32)
+    return result
+
+
+class RefinedGrid:
+    """Сетка напоров на неравномерных осях: x — координаты столбцов, y — строк."""
+
+    def __init__(self, x, y, values):
+        self.x = np.asarray(x)
+        self.y = np.asarray(y)
+        self.grid = HeadGrid.wrap(values)
+
+    @property
+    def values(self):
+        return self.grid.values
+
+    @property
+    def shape(self):
+        return self.grid.shape
+
+    def to_pyvista(self, scalars='Напор'):
+        """Поверхность PyVista: высота узлов — напор, узлы без данных скрыты."""
+        import pyvista as pv
+
+        X, Y = np.meshgrid(self.x, self.y)
+        mask = self.grid.mask
+        Z = np.where(mask, 0.0, self.values)
+        surface = pv.StructuredGrid(X, Y, Z)
+        # Точки StructuredGrid из двумерных массивов идут в порядке Fortran
+        surface.point_data[scalars] = self.values.ravel(order='F')
+        if mask.any():
+            surface.hide_points(mask.ravel(order='F'))
+        return surface
+
+
+def refine(grid, windows, extent=None, axes=None):
+    """Сгущает сетку в окнах (row_start, row_end, col_start, col_end, factor).
+
+    Координаты базовой сетки задаются охватом extent (как в contourmap) или
+    явными осями axes = (x, y); по умолчанию — индексы узлов.
+    """
+    grid = grid if isinstance(grid, HeadGrid) else HeadGrid(grid, nodata=())
+    rows, cols = grid.shape
+    if axes is not None:
+        x, y = axes
+    elif extent is not None:
+        x, y = grid_axes(grid.shape, extent)
+    else:
+        x, y = np.arange(cols, dtype=np.float64), np.arange(rows, dtype=np.float64)
+
+    row_positions = refine_positions(rows, [(r0, r1, factor) for r0, r1, _, _, factor in windows])
+    col_positions = refine_positions(cols, [(c0, c1, factor) for _, _, c0, c1, factor in windows])
+    return RefinedGrid(np.interp(col_positions, np.arange(cols), x), np.interp(row_positions, np.arange(rows), y),
+                       bilinear(grid.values, row_positions[:, None], col_positions[None, :]))
+
+
+def cell_indicators(values):
+    """Показатели ячеек базовой сетки (rows - 1 x cols - 1).
+
+    Наибольшие по углам ячейки модуль градиента и кривизна (|d2h/dx2| + |d2h/dy2|)
+    в единицах напора на ячейку, и число углов без данных (0..4).
+    """
+    gy, gx = np.gradient(np.asarray(values, dtype=np.float64))
+    gradient = np.hypot(gx, gy)
+    curvature = np.abs(np.gradient(gx, axis=1)) + np.abs(np.gradient(gy, axis=0))
+
+    def corners(a):
+        return np.stack([a[:-1, :-1], a[:-1, 1:], a[1:, :-1], a[1:, 1:]])
+
+    missing = np.isnan(corners(values)).sum(axis=0)
+    return np.fmax.reduce(corners(gradient)), np.fmax.reduce(corners(curvature)), missing
+
+
+def pool(a, size, ufunc):
+    """Свертка блоков size x size ячеек (крайние блоки могут быть неполными) функцией ufunc."""
+    rows, cols = np.arange(0, a.shape[0], size), np.arange(0, a.shape[1], size)
+    return ufunc.reduceat(ufunc.reduceat(a, rows, axis=0), cols, axis=1)
+
+
+class AdaptiveGrid:
+    """Листья квадродерева и их вершины с напорами.
+
+    cells — листья (строка, столбец, высота, ширина) в единицах базовых ячеек;
+    rows, cols — положения вершин, x, y — их координаты, values — напоры.
+    triangles — конформная триангуляция вершин (с висячими узлами на стыках
+    листьев разного размера), mask — треугольники без данных.
+    """
+
+    def __init__(self, cells, rows, cols, x, y, values, triangles, mask):
+        self.cells = cells
+        self.rows = rows
+        self.cols = cols
+        self.x = x
+        self.y = y
+        self.values = values
+        self.triangles = triangles
+        self.mask = mask
+
+    def triangulation(self):
+        """Триангуляция matplotlib для tricontourf и tripcolor."""
+        from matplotlib.tri import Triangulation
+
+        return Triangulation(self.x, self.y, self.triangles, mask=self.mask)
+
+    def to_pyvista(self, scalars='Напор'):
+        """Поверхность PyVista из треугольников с данными; высота вершин — напор."""
+        import pyvista as pv
+
+        points = np.column_stack([self.x, self.y, np.where(np.isnan(self.values), 0.0, self.values)])
+        triangles = self.triangles[~self.mask]
+        faces = np.column_stack([np.full(len(triangles), 3), triangles]).ravel()
+        surface = pv.PolyData(points, faces)
+        surface.point_data[scalars] = self.values
+        return surface
+
+
+def adaptive_refine(grid, gradient=None, curvature=None, max_size=8, min_size=0.25, extent=None, axes=None):
+    """Квадродерево по сетке напоров: ячейки делятся там, где напор меняется быстро.
+
+    Корневые ячейки — блоки max_size x max_size базовых ячеек. Ячейка размера s
+    делится на четыре, пока наибольший градиент в ней, умноженный на s, больше
+    gradient или наибольшая кривизна, умноженная на s^2, больше curvature, то
+    есть пока перепад напора в ячейке больше порога (в единицах напора). Ниже
+    базовой ячейки (min_size < 1) значения берутся билинейно. Блоки частично без
+    данных делятся до базовых ячеек, целиком без данных — отбрасываются.
+    max_size и min_size — степени двойки.
+    """
+    grid = grid if isinstance(grid, HeadGrid) else HeadGrid(grid, nodata=())
+    for size in (max_size, min_size):
+        if size <= 0 or not float(np.log2(size)).is_integer():
+            raise ValueError(f"Размер ячейки должен быть степенью двойки: {size}.")
+    if max_size < 1 or min_size > max_size:
+        raise ValueError("Нужно min_size <= max_size и max_size >= 1.")
+
+    n_rows, n_cols = grid.shape[0] - 1, grid.shape[1] - 1
+    cell_gradient, cell_curvature, missing = cell_indicators(grid.values)
+
+    leaves = []
+    size = float(max_size)
+    r, c = (a.ravel().astype(np.float64) for a in np.meshgrid(np.arange(0, n_rows, max_size),
+                                                               np.arange(0, n_cols, max_size), indexing='ij'))
+    while len(r):
+        if size >= 1:
+            s = int(size)
+            index = ((r // s).astype(np.int64), (c // s).astype(np.int64))
+            g = pool(cell_gradient, s, np.fmax)[index]
+            k = pool(cell_curvature, s, np.fmax)[index]
+            fewest = pool(missing, s, np.minimum)[index]
+            most = pool(missing, s, np.maximum)[index]
+        else:
+            index = (r.astype(np.int64), c.astype(np.int64))
+            g, k, fewest = cell_gradient[index], cell_curvature[index], missing[index]
+            most = fewest
+
+        present = fewest < 4
+        r, c, g, k, most = r[present], c[present], g[present], k[present], most[present]
+        split = np.zeros(len(r), dtype=bool)
+        with np.errstate(invalid='ignore'):
+            if gradient is not None:
+                split |= g * size > gradient
+            if curvature is not None:
+                split |= k * size ** 2 > curvature
+        # Граница данных разрешается до базовых ячеек, мельче — только ячейки без пропусков
+        split = split | (most > 0) if size > 1 else split & (most == 0)
+        split &= size > min_size
+
+        leaves.append(np.column_stack([r[~split], c[~split], np.minimum(size, n_rows - r[~split]),
+                                       np.minimum(size, n_cols - c[~split])]))
+        half = size / 2
+        r = np.concatenate([r[split], r[split] + half, r[split], r[split] + half])
+        c = np.concatenate([c[split], c[split], c[split] + half, c[split] + half])
+        inside = (r < n_rows) & (c < n_cols)
+        r, c, size = r[inside], c[inside], half
+    cells = np.concatenate(leaves)
+
+    # Вершины листьев; все положения кратны min_size, поэтому совпадающие узлы находятся по целым ключам
+    r, c, height, width = cells.T
+    corners = np.column_stack([np.concatenate([r, r + height, r, r + height]),
+                               np.concatenate([c, c, c + width, c + width])])
+    keys = np.unique(np.rint(corners / min_size).astype(np.int64), axis=0)
+    rows, cols = keys[:, 0] * min_size, keys[:, 1] * min_size
+    values = bilinear(grid.values, rows, cols)
+
+    triangles = Delaunay(np.column_stack([cols, rows]), qhull_options='QJ').simplices
+    # Треугольник без данных: вершина без напора или центр в ячейке с пропусками (через отброшенные блоки)
+    center_rows = np.clip(rows[triangles].mean(axis=1).astype(np.int64), 0, n_rows - 1)
+    center_cols = np.clip(cols[triangles].mean(axis=1).astype(np.int64), 0, n_cols - 1)
+    mask = np.isnan(values[triangles]).any(axis=1) | (missing[center_rows, center_cols] > 0)
+
+    if axes is not None:
+        x_axis, y_axis = axes
+    elif extent is not None:
+        x_axis, y_axis = grid_axes(grid.shape, extent)
+    else:
+        x_axis, y_axis = np.arange(grid.shape[1]), np.arange(grid.shape[0])
+    x = np.interp(cols, np.arange(grid.shape[1]), x_axis)
+    y = np.interp(rows, np.arange(grid.shape[0]), y_axis)
+    return AdaptiveGrid(cells, rows, cols, x, y, values, triangles, mask)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Карта изолиний по сетке напоров, сгущенной в окнах или квадродеревом.")
+    parser.add_argument('grid', help="Сетка: CSV без заголовка, JSON-массив, .npy или GeoTIFF")
+    parser.add_argument('--extent', type=float, nargs=4, required=True, metavar=('XMIN', 'XMAX', 'YMIN', 'YMAX'))
+    parser.add_argument('--window', type=int, nargs=5, action='append', default=[],
+                        metavar=('ROW_START', 'ROW_END', 'COL_START', 'COL_END', 'FACTOR'),
+                        help="Окно уточнения в ячейках и кратность деления; можно повторять")
+    parser.add_argument('--gradient', type=float, help="Квадродерево: порог перепада напора в ячейке по градиенту")
+    parser.add_argument('--curvature', type=float, help="Квадродерево: порог перепада напора в ячейке по кривизне")
+    parser.add_argument('--max-size', type=int, default=8, help="Квадродерево: размер корневых ячеек (степень двойки)")
+    parser.add_argument('--min-size', type=float, default=0.25, help="Квадродерево: наименьший размер ячеек")
+    parser.add_argument('--levels', type=int, default=10, help="Число уровней шкалы")
+    parser.add_argument('--cmap', help="Цветовая схема matplotlib")
+    parser.add_argument('--title', default='')
+    parser.add_argument('--output', required=True, help="Файл карты (.png, .jpg, .svg)")
+    parser.add_argument('--dpi', type=int, default=300)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from contourmap import make_contour_map
+
+    args = parse_args(argv)
+    grid = HeadGrid.read(args.grid)
+    if args.gradient is not None or args.curvature is not None:
+        if args.window:
+            raise SystemExit("Окна --window и пороги квадродерева взаимоисключающие.")
+        adaptive = adaptive_refine(grid, args.gradient, args.curvature, args.max_size, args.min_size,
+                                   tuple(args.extent))
+        make_contour_map(adaptive.values, None, levels=args.levels, cmap=args.cmap, title=args.title,
+                         output=args.output, dpi=args.dpi, triangulation=adaptive.triangulation())
+        print(f"Листьев: {len(adaptive.cells)}, узлов: {len(adaptive.values)} (в базовой сетке {grid.values.size}), "
+              f"карта сохранена: {args.output}")
+        return
+
+    refined = refine(grid, args.window, tuple(args.extent))
+    make_contour_map(refined.grid, None, levels=args.levels, cmap=args.cmap, title=args.title, output=args.output,
+                     dpi=args.dpi, axes=(refined.x, refined.y))
+    print(f"Сетка {refined.shape[0]} x {refined.shape[1]}, карта сохранена: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Пакетный рендер 3D модели скважин без дисплея.
+
+Пример:
+    python render.py multipledata.csv --start 1515974400 --end 1546300800 --output frames
+    python render.py multipledata.csv --output frames --workers 8
+    python render.py multipledata.csv --video animation.mp4 --fps 30 --substeps 8 --method pchip
+"""
+import argparse
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from interpolation import FrameInterpolator
+from pyVistaPlot import Plot
+from store import load_store
+from wells import WellTable
+
+
+def select_timestamps(store, start=None, end=None):
+    """Timestamp индекса в диапазоне [start, end]; границы необязательны."""
+    i = 0 if start is None else np.searchsorted(store.timestamps, start, side='left')
+    j = len(store) if end is None else np.searchsorted(store.timestamps, end, side='right')
+    return store.timestamps[i:j]
+
+
+def frame_path(output_dir, timestamp, prefix='well_model', extension='png'):
+    return os.path.join(output_dir, f'{prefix}_{timestamp}.{extension}')
+
+
+class FrameRenderer:
+    """Внеэкранный рендер кадров: сцена строится один раз, далее обновляются только скважины."""
+
+    def __init__(self, store, well_table=None, window_size=(1024, 768)):
+        self.store = store
+        self.plot = Plot(off_screen=True, window_size=window_size)
+        if well_table is not None:
+            self.plot.well_table = well_table.reorder(store.well_columns)
+
+        x_coordinate, y_coordinate, _, n_wells = self.plot.filter_data(store, store.timestamps[0])
+        self.plot.build_scene(self.plot.well_layout(x_coordinate, y_coordinate, n_wells, store.well_columns),
+                              clim=self.plot.color_limits(store))
+
+    def render(self, timestamps, output_dir):
+        """Пишет по одному изображению на Timestamp и возвращает пути файлов."""
+        paths = []
+        for timestamp in timestamps:
+            x_coordinate, y_coordinate, z_coordinates, _ = self.plot.filter_data(self.store, timestamp)
+            self.plot.move_wells(x_coordinate, y_coordinate)
+            self.plot.update_wells(z_coordinates)
+            path = frame_path(output_dir, timestamp)
+            self.plot.plotter.screenshot(path)
+            paths.append(path)
+        return paths
+
+    def write_movie(self, timestamps, filename, fps=30, substeps=0, method='linear'):
+        """Пишет кадры прямо в видео или GIF без промежуточных изображений."""
+        self.plot.write_movie(self.store, timestamps, filename, fps, substeps, method)
+
+    def close(self):
+        self.plot.plotter.close()
+
+
+def render_frames(store, timestamps, output_dir, well_table=None, window_size=(1024, 768)):
+    """Рендерит по одному изображению на Timestamp в одном процессе."""
+    os.makedirs(output_dir, exist_ok=True)
+    renderer = FrameRenderer(store, well_table, window_size)
+    try:
+        return renderer.render(timestamps, output_dir)
+    finally:
+        renderer.close()
+
+
+# Рендерер процесса-исполнителя: создается один раз в init_worker и живет до конца пула
+_worker_renderer = None
+
+
+def init_worker(csv_path, wells_path, window_size):
+    """Инициализация процесса пула: индекс из кэша (memory-map) и своя внеэкранная сцена."""
+    global _worker_renderer
+    well_table = WellTable.from_csv(wells_path) if wells_path else None
+    _worker_renderer = FrameRenderer(load_store(csv_path), well_table, window_size)
+
+
+def render_batch(timestamps, output_dir):
+    return _worker_renderer.render(timestamps, output_dir)
+
+
+def render_parallel(csv_path, timestamps, output_dir, workers, wells_path=None, window_size=(1024, 768), batch_size=None):
+    """Распределяет кадры по пулу процессов, каждый со своей сценой.
+
+    Кадры делятся на последовательные пакеты (по умолчанию примерно четыре на
+    процесс, чтобы выровнять нагрузку); результаты собираются в исходном порядке.
+    Индекс должен быть уже закэширован (load_store), тогда процессы открывают его
+    через memory-map, не разбирая CSV.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if batch_size is None:
+        batch_size = max(1, -(-len(timestamps) // (workers * 4)))
+    batches = [timestamps[i:i + batch_size] for i in range(0, len(timestamps), batch_size)]
+
+    # spawn: каждый процесс поднимает собственный контекст VTK/OpenGL, а не копию родительского
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker,
+                             initargs=(csv_path, wells_path, window_size)) as executor:
+        paths = []
+        for batch_paths in executor.map(render_batch, batches, [output_dir] * len(batches)):
+            paths.extend(batch_paths)
+    return paths
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетный рендер 3D модели скважин по Timestamp без дисплея.")
+    parser.add_argument('csv', help="CSV с колонками Timestamp, Well1..WellN, Xpos, Ypos")
+    parser.add_argument('--start', type=float, help="Первый Timestamp (включительно)")
+    parser.add_argument('--end', type=float, help="Последний Timestamp (включительно)")
+    parser.add_argument('--output', default='frames', help="Каталог для изображений")
+    parser.add_argument('--wells', help="CSV с координатами скважин (Well, X, Y, Collar)")
+    parser.add_argument('--video', help="Записать анимацию в видео (.mp4, .avi) или .gif вместо изображений")
+    parser.add_argument('--fps', type=int, default=30, help="Частота кадров видео")
+    parser.add_argument('--substeps', type=int, default=0, help="Промежуточных кадров видео между Timestamp")
+    parser.add_argument('--method', choices=FrameInterpolator.METHODS, default='linear',
+                        help="Интерполяция промежуточных кадров")
+    parser.add_argument('--workers', type=int, default=1, help="Число процессов рендера")
+    parser.add_argument('--window-size', type=int, nargs=2, default=(1024, 768), metavar=('WIDTH', 'HEIGHT'))
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    store = load_store(args.csv)
+    timestamps = select_timestamps(store, args.start, args.end)
+    if len(timestamps) == 0:
+        raise SystemExit("Нет Timestamp в заданном диапазоне.")
+
+    if args.video:
+        well_table = WellTable.from_csv(args.wells) if args.wells else None
+        renderer = FrameRenderer(store, well_table, tuple(args.window_size))
+        try:
+            renderer.write_movie(timestamps, args.video, args.fps, args.substeps, args.method)
+        finally:
+            renderer.close()
+        print(f"Видео сохранено: {args.video}")
+        return
+
+    if args.workers > 1:
+        paths = render_parallel(args.csv, timestamps, args.output, args.workers, args.wells, tuple(args.window_size))
+    else:
+        well_table = WellTable.from_csv(args.wells) if args.wells else None
+        paths = render_frames(store, timestamps, args.output, well_table, tuple(args.window_size))
+    print(f"Сохранено изображений: {len(paths)} в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,16 @@ import numpy as np
 import scipy as sp
 from scipy import stats
 import matplotlib.patches as mpl_patches
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from csvcache import read_csv_cached
 
 #%%
 #Read CSV file in the folder
-data = pd.read_csv('chart1.csv')
+#Parsed columns are cached next to the file (see csvcache.py), later runs skip parsing
+data = read_csv_cached('chart1.csv')
 
 data.to_csv('new_chart.csv', index=False)
 
@@ -0,0 +1,305 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from csvcache import (cache_dir, finish_bundle, is_fresh, open_bundle_array, read_bundle, read_meta, replace_bundle,
+                      start_bundle)
+
+# Колонки скважин в заголовке CSV: Well1, Well2, ...
+WELL_PATTERN = r'Well(\d+)'
+
+
+def find_well_columns(columns, pattern=WELL_PATTERN):
+    """Находит колонки скважин по шаблону и сортирует их по номеру (Well2 раньше Well10)."""
+    regex = re.compile(pattern)
+    numbered = []
+    for column in columns:
+        match = regex.fullmatch(str(column))
+        if match:
+            numbered.append((int(match.group(1)), column))
+    return [column for _, column in sorted(numbered)]
+
+
+class TimestampStore:
+    """Индекс данных скважин по Timestamp.
+
+    Строится один раз после загрузки файла: строки сортируются по Timestamp,
+    для каждого уникального Timestamp запоминается диапазон строк, а глубины
+    скважин хранятся в одной непрерывной матрице float32.
+    Выборка кадра — бинарный поиск и срез без копирования.
+    """
+
+    def __init__(self, data, well_columns=None):
+        row_timestamps = data['Timestamp'].to_numpy()
+        order = np.argsort(row_timestamps, kind='stable')
+        row_timestamps = row_timestamps[order]
+
+        # Отсортированные уникальные метки и смещения строк: строки метки i лежат в [offsets[i], offsets[i + 1])
+        self.timestamps, starts = np.unique(row_timestamps, return_index=True)
+        self.offsets = np.append(starts, len(row_timestamps))
+
+        # Колонки скважин берутся из заголовка, если не заданы явно
+        self.well_columns = list(well_columns) if well_columns is not None else find_well_columns(data.columns)
+        if not self.well_columns:
+            raise ValueError("В данных нет колонок скважин.")
+
+        # Матрица выделяется один раз и заполняется в порядке сортировки без промежуточных копий
+        self.wells = np.empty((len(order), len(self.well_columns)), dtype=np.float32)
+        np.take(data[self.well_columns].to_numpy(dtype=np.float32), order, axis=0, out=self.wells)
+        self.xpos = data['Xpos'].to_numpy()[order]
+        self.ypos = data['Ypos'].to_numpy()[order]
+
+        summary = WellSummary(len(self.well_columns))
+        summary.update(self.wells)
+        summary.store(self)
+
+    # Массивы, из которых состоит индекс; в кэше каждый лежит отдельным .npy
+    ARRAYS = ('timestamps', 'offsets', 'wells', 'xpos', 'ypos', 'well_min', 'well_max', 'well_mean', 'well_count')
+
+    @classmethod
+    def load(cls, directory):
+        """Открывает индекс из кэша через memory-map, без разбора CSV."""
+        meta = read_meta(directory)
+        store = cls.__new__(cls)
+        for name, array in read_bundle(directory, cls.ARRAYS).items():
+            setattr(store, name, array)
+
+        # Массивы строк выделяются по верхней оценке числа строк, лишний хвост отбрасывается
+        rows = slice(0, meta['rows'])
+        store.wells, store.xpos, store.ypos = store.wells[rows], store.xpos[rows], store.ypos[rows]
+        store.well_columns = meta['well_columns']
+        return store
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def n_wells(self):
+        return self.wells.shape[1]
+
+    @property
+    def depths(self):
+        """Глубины скважин по первой строке каждого Timestamp: массив (n_wells, n_timestamps)."""
+        if len(self.timestamps) == len(self.wells):
+            return self.wells.T
+        return self.wells[self.offsets[:-1]].T
+
+    def window(self, start, end):
+        """Загружает в память только строки с start <= Timestamp <= end.
+
+        Возвращает метки окна, смещения строк относительно начала окна и копию
+        матрицы скважин окна; остальной файл остается на диске.
+        """
+        i = np.searchsorted(self.timestamps, start, side='left')
+        j = np.searchsorted(self.timestamps, end, side='right')
+        rows = slice(self.offsets[i], self.offsets[j])
+        return np.array(self.timestamps[i:j]), np.array(self.offsets[i:j + 1] - self.offsets[i]), np.array(self.wells[rows])
+
+    def rows(self, timestamp):
+        """Возвращает срез строк для Timestamp за O(log T)."""
+        i = np.searchsorted(self.timestamps, timestamp)
+        if i == len(self.timestamps) or self.timestamps[i] != timestamp:
+            raise ValueError(f"Нет данных для timestamp {timestamp}.")
+        return slice(self.offsets[i], self.offsets[i + 1])
+
+
+class LoadCancelled(Exception):
+    """Загрузка файла отменена пользователем."""
+
+
+def load_store(file_path, progress=None, cancelled=None, chunksize=100_000, use_cache=True):
+    """Строит TimestampStore из CSV потоково, с ограниченным расходом памяти.
+
+    Файл читается частями по chunksize строк, части сразу записываются в массивы
+    на диске (кэш рядом с файлом), попутно строятся индекс Timestamp и сводка по
+    скважинам. Итоговый индекс открывается через memory-map, поэтому в памяти
+    оказываются только запрошенные кадры и окна. Свежий кэш открывается сразу.
+
+    Новый индекс собирается в отдельном каталоге и заменяет кэш только целиком,
+    поэтому уже открытые индексы продолжают читать прежние файлы. Если рядом с
+    файлом писать нельзя (или use_cache=False), индекс строится во временном
+    каталоге, который удаляется вместе с индексом.
+
+    progress(доля) вызывается после каждой части, cancelled() проверяется между
+    частями; при отмене выбрасывается LoadCancelled. Функция не трогает Tk и
+    предназначена для фонового потока.
+    """
+    directory = cache_dir(file_path, 'store')
+    if use_cache and is_fresh(directory, file_path):
+        if progress is not None:
+            progress(1.0)
+        return TimestampStore.load(directory)
+
+    building = None
+    if use_cache:
+        try:
+            building = tempfile.mkdtemp(prefix=f'{os.path.basename(directory)}.', suffix='.part',
+                                        dir=os.path.dirname(os.path.abspath(directory)))
+        except OSError:
+            pass  # Кэш необязателен: каталог может быть только для чтения
+    cached = building is not None
+    if not cached:
+        building = tempfile.mkdtemp(prefix='store-')
+
+    try:
+        build_store(building, file_path, progress, cancelled, chunksize)
+    except BaseException:
+        # Недостроенный индекс (в том числе raw_*.npy) не остается на диске
+        shutil.rmtree(building, ignore_errors=True)
+        raise
+
+    if cached:
+        try:
+            replace_bundle(building, directory)
+            building = directory
+        except OSError:
+            cached = False
+    store = TimestampStore.load(building)
+    if not cached:
+        weakref.finalize(store, shutil.rmtree, building, True)
+    return store
+
+
+def build_store(directory, file_path, progress=None, cancelled=None, chunksize=100_000):
+    """Записывает индекс CSV в пустой каталог directory (см. load_store)."""
+    digest, max_rows = scan_source(file_path, cancelled)
+    well_columns = find_well_columns(pd.read_csv(file_path, nrows=0).columns)
+    if max_rows == 0:
+        raise ValueError("Файл не содержит данных.")
+    if not well_columns:
+        raise ValueError("В данных нет колонок скважин.")
+
+    start_bundle(directory)
+    size = os.path.getsize(file_path) or 1
+    raw = {
+        'wells': open_bundle_array(directory, 'raw_wells', np.float32, (max_rows, len(well_columns))),
+        'xpos': open_bundle_array(directory, 'raw_xpos', np.float64, (max_rows,)),
+        'ypos': open_bundle_array(directory, 'raw_ypos', np.float64, (max_rows,)),
+    }
+    row_timestamps = None
+    summary = WellSummary(len(well_columns))
+    n_rows = 0
+    is_sorted = True
+
+    with open(file_path, 'rb') as f:
+        for chunk in pd.read_csv(f, chunksize=chunksize):
+            if cancelled is not None and cancelled():
+                raise LoadCancelled()
+
+            rows = slice(n_rows, n_rows + len(chunk))
+            timestamps = chunk['Timestamp'].to_numpy()
+            if row_timestamps is None:
+                row_timestamps = open_bundle_array(directory, 'raw_timestamps', timestamps.dtype, (max_rows,))
+            elif is_sorted and timestamps[0] < row_timestamps[n_rows - 1]:
+                is_sorted = False
+            is_sorted = is_sorted and bool(np.all(timestamps[1:] >= timestamps[:-1]))
+
+            block = chunk[well_columns].to_numpy(dtype=np.float32)
+            row_timestamps[rows] = timestamps
+            raw['wells'][rows] = block
+            raw['xpos'][rows] = chunk['Xpos'].to_numpy()
+            raw['ypos'][rows] = chunk['Ypos'].to_numpy()
+            summary.update(block)
+            n_rows = rows.stop
+
+            if progress is not None:
+                progress(min(f.tell() / size, 1.0))
+
+    if is_sorted:
+        # Экспорты телеметрии обычно уже упорядочены по времени: файлы просто переименовываются
+        for name in raw:
+            raw[name].flush()
+            os.replace(os.path.join(directory, f'raw_{name}.npy'), os.path.join(directory, f'{name}.npy'))
+    else:
+        # Неупорядоченный файл переставляется на диске блоками; в памяти только метки и порядок строк
+        order = np.argsort(row_timestamps[:n_rows], kind='stable')
+        for name, source in raw.items():
+            target = open_bundle_array(directory, name, source.dtype, source.shape)
+            for i in range(0, n_rows, chunksize):
+                target[i:i + chunksize] = source[order[i:i + chunksize]]
+            target.flush()
+        sorted_timestamps = np.asarray(row_timestamps[:n_rows])[order]
+        row_timestamps[:n_rows] = sorted_timestamps
+        del order, sorted_timestamps
+    del raw
+
+    timestamps, offsets = unique_offsets(row_timestamps, n_rows, chunksize)
+    del row_timestamps
+    for name in ('raw_timestamps', 'raw_wells', 'raw_xpos', 'raw_ypos'):
+        path = os.path.join(directory, f'{name}.npy')
+        if os.path.exists(path):
+            os.remove(path)
+
+    arrays = {'timestamps': timestamps, 'offsets': offsets}
+    summary.store(arrays)
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f'{name}.npy'), array)
+    finish_bundle(directory, file_path, digest=digest, rows=n_rows, well_columns=well_columns)
+
+
+def scan_source(file_path, cancelled=None, block_size=1 << 24):
+    """Один быстрый проход по байтам файла: хеш содержимого и верхняя оценка числа строк данных."""
+    digest = hashlib.sha1()
+    newlines = 0
+    last = b'\n'
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            if cancelled is not None and cancelled():
+                raise LoadCancelled()
+            digest.update(block)
+            newlines += block.count(b'\n')
+            last = block[-1:]
+
+    # Последняя строка может быть без перевода строки; заголовок не считается
+    lines = newlines + (last != b'\n')
+    return digest.hexdigest(), max(lines - 1, 0)
+
+
+def unique_offsets(row_timestamps, n_rows, block=1_000_000):
+    """Уникальные метки и смещения строк по упорядоченному массиву на диске, блоками."""
+    starts = [np.zeros(1, dtype=np.int64)]
+    for i in range(0, n_rows, block):
+        # Блок захватывает одну строку следующего, чтобы не пропустить смену метки на границе
+        values = np.asarray(row_timestamps[i:min(i + block + 1, n_rows)])
+        starts.append(np.flatnonzero(values[1:] != values[:-1]) + i + 1)
+    starts = np.concatenate(starts)
+    return np.asarray(row_timestamps[starts]), np.append(starts, n_rows)
+
+
+class WellSummary:
+    """Накопление минимума, максимума, среднего и числа значений по скважинам частями."""
+
+    def __init__(self, n_wells):
+        self.minimum = np.full(n_wells, np.nan)
+        self.maximum = np.full(n_wells, np.nan)
+        self.total = np.zeros(n_wells)
+        self.count = np.zeros(n_wells, dtype=np.int64)
+
+    def update(self, block):
+        """Учитывает часть строк (массив n_rows x n_wells); пропуски NaN игнорируются."""
+        if len(block) == 0:
+            return
+        self.minimum = np.fmin(self.minimum, np.fmin.reduce(block, axis=0))
+        self.maximum = np.fmax(self.maximum, np.fmax.reduce(block, axis=0))
+        self.total += np.nansum(block, axis=0, dtype=np.float64)
+        self.count += np.count_nonzero(~np.isnan(block), axis=0)
+
+    def store(self, target):
+        """Записывает сводку в словарь массивов или в атрибуты объекта."""
+        values = {
+            'well_min': self.minimum,
+            'well_max': self.maximum,
+            'well_mean': np.divide(self.total, self.count, out=np.full_like(self.total, np.nan), where=self.count > 0),
+            'well_count': self.count,
+        }
+        for name, value in values.items():
+            if isinstance(target, dict):
+                target[name] = value
+            else:
+                setattr(target, name, value)
@@ -3,10 +3,16 @@ import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import pandas as pd
 import numpy as np
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from csvcache import read_csv_cached
 
 #%%
 #Read CSV file in the folder
-data = pd.read_csv('multipledata.csv')
+#Parsed columns are cached next to the file (see csvcache.py), later runs skip parsing
+data = read_csv_cached('multipledata.csv')
 
 #Change timeStampt to datetime data
 date = pd.to_datetime(data['timeStamp'] ,unit='s')
@@ -1,27 +1,21 @@
 #%%
 import matplotlib.pyplot as plt
 import numpy as np
-import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from headgrid import HeadGrid
 
 #%%
 #Read JSON file
-with open('41de94ea9d135d78636a4bf0739551064dab697f.json') as f:
-    d = json.load(f)
- 
-#Change JSON file type (list) to numpy array
-data = np.asarray(d)
-
-#Change 9999 value to -1 (in case json file was used to create contour map first)
-data[data == 9999] = 1
-
-#Find min value in the array to set as min of the color palette
-a = np.amin(data)
+#Nodata values (-1, or 9999 if json file was used to create contour map first) become NaN
+#and are left as holes in the surface
+grid = HeadGrid.read('41de94ea9d135d78636a4bf0739551064dab697f.json')
+data = grid.values
 
-#Find max value in the array to set as min of the color palette
-#Sort array into a list from max to min, disregard to repeating values
-#rounded the decimals to 10 digits, choose the second largest value
-#as the largest is 99999
-b = np.partition(np.unique(data.flatten().round(decimals=10)), -1)[-2]
+#Min and max of the color palette over the nodes with data
+a, b = grid.color_limits()
 
 #%%
 #Insert coordinates
@@ -39,7 +33,8 @@ yAxis = np.linspace(ymax,ymin,num=np.shape(data)[1])
 title = input('Input graph title: ')
 
 #Make a grid from xAxis and yAxis arrays
-X ,Y = np.meshgrid(xAxis,yAxis)
+#sparse: a row and a column that broadcast against data, no full-size copies
+X ,Y = np.meshgrid(xAxis,yAxis, sparse=True)
 
 #Map resolution (by editting intervals on scale bar)
 c = int(input('Insert a number to edit scale bar levels: '))
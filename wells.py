@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+
+class WellTable:
+    """Таблица расположения скважин: идентификатор, X, Y и отметка устья.
+
+    По координатам строится KD-дерево, поэтому поиск ближайших скважин,
+    выбор скважины мышью и запросы окрестности выполняются за O(log n).
+    """
+
+    def __init__(self, ids, x, y, collar=None):
+        self.ids = np.asarray(ids).astype(str)
+        self.xy = np.column_stack([x, y]).astype(np.float64)
+        self.collar = np.zeros(len(self.ids)) if collar is None else np.asarray(collar, dtype=np.float64)
+        self.tree = cKDTree(self.xy)
+
+    @classmethod
+    def from_csv(cls, file_path):
+        """Читает таблицу скважин из CSV с колонками Well, X, Y и необязательной Collar."""
+        table = pd.read_csv(file_path)
+        missing = {'Well', 'X', 'Y'} - set(table.columns)
+        if missing:
+            raise ValueError(f"В таблице скважин нет колонок: {', '.join(sorted(missing))}.")
+        collar = table['Collar'].to_numpy() if 'Collar' in table.columns else None
+        return cls(table['Well'], table['X'].to_numpy(), table['Y'].to_numpy(), collar)
+
+    @classmethod
+    def default_layout(cls, well_columns, x_coordinate=0, y_coordinate=0):
+        """Прежняя раскладка без реальных координат: скважины в ряд с шагом по X."""
+        offsets = np.linspace(-25, 25, len(well_columns))
+        return cls(well_columns, x_coordinate + offsets, np.full(len(well_columns), y_coordinate))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def x(self):
+        return self.xy[:, 0]
+
+    @property
+    def y(self):
+        return self.xy[:, 1]
+
+    def bounds(self, padding=5):
+        """Границы поля скважин (xmin, xmax, ymin, ymax) с отступом."""
+        (xmin, ymin), (xmax, ymax) = self.xy.min(axis=0), self.xy.max(axis=0)
+        return xmin - padding, xmax + padding, ymin - padding, ymax + padding
+
+    def reorder(self, well_columns):
+        """Возвращает таблицу в порядке колонок скважин из данных."""
+        index = {well_id: i for i, well_id in enumerate(self.ids)}
+        missing = [column for column in well_columns if column not in index]
+        if missing:
+            raise ValueError(f"Нет координат для скважин: {', '.join(missing[:10])}.")
+        order = np.array([index[column] for column in well_columns], dtype=np.intp)
+        return WellTable(self.ids[order], self.x[order], self.y[order], self.collar[order])
+
+    def nearest(self, x, y, k=1):
+        """Индексы и расстояния до k ближайших скважин."""
+        distances, indices = self.tree.query(np.column_stack([np.atleast_1d(x), np.atleast_1d(y)]), k=k)
+        return indices, distances
+
+    def within(self, x, y, radius):
+        """Индексы скважин в радиусе radius от точки."""
+        return np.asarray(self.tree.query_ball_point((x, y), radius), dtype=np.intp)
+
+    def pick(self, point):
+        """Индекс скважины, ближайшей к выбранной в сцене точке."""
+        _, index = self.tree.query(point[:2])
+        return int(index)